@@ -0,0 +1,228 @@
+#! /usr/bin/python3
+#
+# This file is part of the d2dcnWidget distribution.
+# Copyright (c) 2023 Javier Moreno Garcia.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import threading
+import resource
+import json
+import time
+import sys
+
+import d2dcnWidget
+import d2dcn
+
+import PyQt5
+import PyQt5.QtCore
+import PyQt5.QtWidgets
+
+# The test fakes stand in for d2dcn so the benchmark needs no broker
+from test import fakeClient, fakeReader, fakeCommand
+
+
+def rssBytes():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(samples, fraction):
+    if len(samples) == 0:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def waitUntil(app, condition, timeout):
+    start = time.monotonic()
+    while not condition():
+        if time.monotonic() - start > timeout:
+            return False
+        app.processEvents()
+        time.sleep(0.001)
+    return True
+
+
+def publishThread(readers, rate, stop_event, counter):
+    period = 1 / rate
+    next_tick = time.monotonic()
+    while not stop_event.is_set():
+        for reader in readers:
+            reader.publish(time.monotonic())
+        counter[0] += len(readers)
+
+        next_tick += period
+        delay = next_tick - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_tick = time.monotonic()
+
+
+def run(args):
+
+    app = PyQt5.QtWidgets.QApplication.instance()
+    if not app:
+        app = PyQt5.QtWidgets.QApplication(sys.argv)
+
+    results = {}
+    total_infos = args.services * args.infos
+
+    # Readers are built before the baseline so only the GUI side is accounted per info
+    client = fakeClient()
+    readers = []
+    for service_index in range(args.services):
+        for info_index in range(args.infos):
+            readers.append(fakeReader("bench", "service" + str(service_index), "category" + str(info_index % args.categories),
+                "info" + str(info_index), d2dcn.constants.valueTypes.FLOAT, 0.0))
+
+    rss_before = rssBytes()
+
+    widget = d2dcnWidget.d2dcnWidget(flush_rate=args.flush_rate,
+        view_mode=d2dcnWidget.d2dcnWidget.TABLE_VIEW if args.table_view else d2dcnWidget.d2dcnWidget.WIDGET_VIEW,
+        lazy_services=not args.eager_services, client=client)
+    widget.setRenderBudget(args.render_budget)
+    widget.subscribeInfo()
+    widget.subscribeComands()
+    widget.show()
+    app.processEvents()
+
+    # Startup: announce everything and wait until every object reached the view
+    start = time.monotonic()
+    for reader in readers:
+        client.addInfo(reader)
+    for service_index in range(args.services):
+        for command_index in range(args.commands):
+            client.addCommand(fakeCommand("bench", "service" + str(service_index), "commands", "command" + str(command_index)))
+
+    def populated():
+        if args.table_view:
+            if widget.findChild(d2dcnWidget.infoTableView).model().rowCount() < total_infos:
+                return False
+            return sum(slot.objectCount() for slot in widget.findChildren(d2dcnWidget.serviceSlot)) >= args.services * args.commands
+        return sum(slot.objectCount() for slot in widget.findChildren(d2dcnWidget.serviceSlot)) >= total_infos + args.services * args.commands
+
+    scroll_area = widget.findChild(PyQt5.QtWidgets.QScrollArea)
+    service_view = widget.findChild(d2dcnWidget.serviceView)
+
+    # Placeholders are not a populated view: eager mode builds every service, lazy mode what the viewport shows
+    def built():
+        viewport = scroll_area.viewport()
+        visible = PyQt5.QtCore.QRect(service_view.mapFrom(viewport, PyQt5.QtCore.QPoint(0, 0)), viewport.size())
+        for slot in widget.findChildren(d2dcnWidget.serviceSlot):
+            if (args.eager_services or visible.intersects(slot.geometry())) and slot.widgetCount() < slot.objectCount():
+                return False
+        return True
+
+    results["topology_complete"] = waitUntil(app, populated, args.timeout)
+    results["topology_seconds"] = time.monotonic() - start
+    results["startup_complete"] = results["topology_complete"] and waitUntil(app, built, args.timeout)
+    results["startup_seconds"] = time.monotonic() - start
+    results["materialized_services"] = sum(slot.isMaterialized() for slot in widget.findChildren(d2dcnWidget.serviceSlot))
+    for step in range(10):
+        app.processEvents()
+    results["rss_per_info_bytes"] = (rssBytes() - rss_before) / max(total_infos, 1)
+
+    # Steady state: every published value is its own send time
+    latencies = []
+    def recordLatency(target, uid, value):
+        if isinstance(value, float) and value > 0:
+            latencies.append(time.monotonic() - value)
+
+    dispatch_targets = [d2dcnWidget.fieldOutput, d2dcnWidget.infoTableModel]
+    original_dispatch = {target: target.dispatchUpdate for target in dispatch_targets}
+    for target in dispatch_targets:
+        target.dispatchUpdate = lambda self, uid, value, original=original_dispatch[target] : (recordLatency(self, uid, value), original(self, uid, value))
+
+    queue_depth = []
+    depth_timer = PyQt5.QtCore.QTimer()
+    depth_timer.timeout.connect(lambda : queue_depth.append(d2dcnWidget.updateDispatcher.instance().pendingCount()))
+    depth_timer.start(10)
+
+    stop_event = threading.Event()
+    published = [0]
+    publisher = threading.Thread(target=publishThread, daemon=True, args=[readers, args.rate, stop_event, published])
+
+    wall_start = time.monotonic()
+    cpu_start = time.thread_time()
+    publisher.start()
+    while time.monotonic() - wall_start < args.duration:
+        app.processEvents()
+        time.sleep(0.001)
+    cpu_time = time.thread_time() - cpu_start
+    wall_time = time.monotonic() - wall_start
+    stop_event.set()
+    publisher.join()
+    depth_timer.stop()
+
+    for target in dispatch_targets:
+        target.dispatchUpdate = original_dispatch[target]
+
+    results["published_updates"] = published[0]
+    results["published_per_second"] = published[0] / wall_time
+    results["rendered_updates"] = len(latencies)
+    results["latency_p50_ms"] = percentile(latencies, 0.5) * 1000 if latencies else None
+    results["latency_p99_ms"] = percentile(latencies, 0.99) * 1000 if latencies else None
+    results["latency_max_ms"] = max(latencies) * 1000 if latencies else None
+    results["queue_depth_mean"] = sum(queue_depth) / len(queue_depth) if queue_depth else 0
+    results["queue_depth_max"] = max(queue_depth) if queue_depth else 0
+    results["gui_cpu_seconds"] = cpu_time
+    results["gui_cpu_ratio"] = cpu_time / wall_time
+
+    widget.close()
+    del widget
+    return results
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="d2dcnWidget benchmark")
+    parser.add_argument('--services', type=int, default=20, help='Number of services')
+    parser.add_argument('--infos', type=int, default=20, help='Infos per service')
+    parser.add_argument('--categories', type=int, default=4, help='Info categories per service')
+    parser.add_argument('--commands', type=int, default=2, help='Commands per service')
+    parser.add_argument('--rate', type=float, default=10, help='Publish rate per info in Hz')
+    parser.add_argument('--duration', type=float, default=5, help='Steady state measurement time in seconds')
+    parser.add_argument('--timeout', type=float, default=60, help='Maximum startup time in seconds')
+    parser.add_argument('--flush-rate', type=float, default=d2dcnWidget.updateDispatcher.DEFAULT_FLUSH_RATE, help='GUI flush rate in Hz')
+    parser.add_argument('--render-budget', type=int, default=d2dcnWidget.updateDispatcher.DEFAULT_RENDER_BUDGET, help='Values redrawn per refresh (0 for no limit)')
+    parser.add_argument('--table-view', action="store_true", help='Use the table view')
+    parser.add_argument('--eager-services', action="store_true", help='Build every service panel on discovery')
+    parser.add_argument('--output', default="benchmark.json", help='Output JSON file')
+    args = parser.parse_args()
+
+    report = {}
+    report["version"] = d2dcnWidget.version
+    report["timestamp"] = time.time()
+    report["parameters"] = vars(args)
+    report["results"] = run(args)
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+
+    print(json.dumps(report["results"], indent=2))
+
+
+# Main execution
+if __name__ == '__main__':
+    main()
@@ -16,3 +16,5 @@
 #
 
 from .d2dcnWidget import *
+from .d2dcnRecord import *
+from .d2dcnTrace import *
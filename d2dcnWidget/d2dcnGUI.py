@@ -17,8 +17,11 @@
 #
 
 from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
 import d2dcnWidget
 import argparse
+import threading
+import signal
 import sys
 
 
@@ -43,6 +46,121 @@ def main():
         default="",
         action="store_true",
         help='Object object horizontal layout')
+    parser.add_argument(
+        '--table-view',
+        required=False,
+        default="",
+        action="store_true",
+        help='Show info values in a single sortable table')
+    parser.add_argument(
+        '--eager-services',
+        required=False,
+        default="",
+        action="store_true",
+        help='Build every service panel on discovery, even when out of view')
+    parser.add_argument(
+        '--release-services',
+        required=False,
+        default="",
+        action="store_true",
+        help='Tear down service panels scrolled far out of view')
+    parser.add_argument(
+        '--flush-rate',
+        metavar = "[FLUSH_RATE]",
+        required=False,
+        type=float,
+        default=d2dcnWidget.updateDispatcher.DEFAULT_FLUSH_RATE,
+        help='Maximum value refresh rate in Hz (0 for no limit)')
+    parser.add_argument(
+        '--render-budget',
+        metavar = "[UPDATES]",
+        required=False,
+        type=int,
+        default=d2dcnWidget.updateDispatcher.DEFAULT_RENDER_BUDGET,
+        help='Maximum values redrawn per refresh, pinned infos first (0 for no limit)')
+    parser.add_argument(
+        '--pin',
+        metavar = "[INFO_NAME_PATTERN]",
+        required=False,
+        action="append",
+        default=[],
+        help='Regular expresion for info names always redrawn first and never rate limited (repeatable)')
+    parser.add_argument(
+        '--history-size',
+        metavar = "[SAMPLES]",
+        required=False,
+        type=int,
+        default=0,
+        help='Samples of history kept per numeric info (0 disables history)')
+    parser.add_argument(
+        '--history-budget',
+        metavar = "[MB]",
+        required=False,
+        type=float,
+        default=d2dcnWidget.historyStore.DEFAULT_BUDGET / (1024 * 1024),
+        help='Memory budget for all history buffers in MB')
+    parser.add_argument(
+        '--trend',
+        required=False,
+        default="",
+        action="store_true",
+        help='Show a trend line next to numeric infos (enables history)')
+    parser.add_argument(
+        '--trend-rate',
+        metavar = "[FRAME_RATE]",
+        required=False,
+        type=float,
+        default=d2dcnWidget.sparklineTicker.DEFAULT_FRAME_RATE,
+        help='Maximum trend repaint rate in Hz (0 for no limit)')
+    parser.add_argument(
+        '--diagnostics',
+        required=False,
+        default="",
+        action="store_true",
+        help='Show the performance counters panel')
+    parser.add_argument(
+        '--trace',
+        metavar = "[FILE]",
+        required=False,
+        default="",
+        help='Write a Chrome trace of the event pipeline (also enabled by ' + d2dcnWidget.TRACE_ENV + ')')
+    parser.add_argument(
+        '--cache',
+        metavar = "[FILE]",
+        required=False,
+        default="",
+        help='Topology cache used to build the view at startup, updated periodically and on exit')
+    parser.add_argument(
+        '--headless',
+        required=False,
+        default="",
+        action="store_true",
+        help='Run without GUI (requires --record)')
+    parser.add_argument(
+        '--record',
+        metavar = "[FILE]",
+        required=False,
+        default="",
+        help='Append every info update to a binary value log')
+    parser.add_argument(
+        '--compress',
+        required=False,
+        default="",
+        action="store_true",
+        help='Compress value log blocks')
+    parser.add_argument(
+        '--replay',
+        metavar = "[FILE]",
+        required=False,
+        default="",
+        help='Feed the GUI from a recorded value log instead of the network')
+    parser.add_argument(
+        '--replay-speed',
+        metavar = "[SPEED]",
+        required=False,
+        type=float,
+        default=d2dcnWidget.d2dcnReplay.REAL_TIME,
+        help='Replay speed factor (1 for real time, 0 for as fast as possible)')
 
     parser.add_argument(
         '--ignore-command',
@@ -105,23 +223,84 @@ def main():
         required=False,
         default="",
         help='Regular expresion for command name pattern')
+    parser.add_argument(
+        '--info-max-rate',
+        metavar = "[RATE]",
+        required=False,
+        type=float,
+        default=0,
+        help='Maximum refresh rate in Hz of each subscribed info (0 for no limit)')
     args = parser.parse_args(sys.argv[1:])
 
+    if args.headless and not args.record:
+        parser.error("--headless requires --record")
+
+    if args.record and not args.headless:
+        parser.error("--record requires --headless")
+
+    if args.headless and args.replay:
+        parser.error("--replay can not be used with --headless")
+
+    d2dcnWidget.enableTracing(args.trace if args.trace else None)
+
+    if args.headless:
+        recorder = d2dcnWidget.d2dcnRecorder(d2dcnWidget.valueLogWriter(args.record, args.compress))
+        if not args.ignore_info:
+            recorder.subscribeInfo(args.info_mac_pattern, args.info_service_pattern, args.info_category_pattern, args.info_name_pattern)
+
+        # Service managers stop the recorder with SIGTERM, it must still flush the last block
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame : stop_event.set())
+
+        try:
+            recorder.start()
+            while not stop_event.wait(1):
+                pass
+
+        except KeyboardInterrupt:
+            pass
+
+        recorder.stop()
+        d2dcnWidget.disableTracing()
+        return
 
     try:
         app = QApplication(sys.argv)
 
-        window = d2dcnWidget.d2dcnWidget(args.device_hlayout, args.category_hlayout, args.object_hlayout)
+        replay = d2dcnWidget.d2dcnReplay(args.replay, args.replay_speed) if args.replay else None
+        window = d2dcnWidget.d2dcnWidget(args.device_hlayout, args.category_hlayout, args.object_hlayout, args.flush_rate,
+            d2dcnWidget.d2dcnWidget.TABLE_VIEW if args.table_view else d2dcnWidget.d2dcnWidget.WIDGET_VIEW,
+            not args.eager_services, args.release_services, replay, args.trend, args.diagnostics)
+        history_size = d2dcnWidget.historyStore.DEFAULT_CAPACITY if args.trend and args.history_size == 0 else args.history_size
+        window.setHistory(history_size, int(args.history_budget * 1024 * 1024))
+        window.setTrendFrameRate(args.trend_rate)
+        window.setRenderBudget(args.render_budget)
         if not args.ignore_command:
             window.subscribeComands(args.command_mac_pattern, args.command_service_pattern, args.command_category_pattern, args.command_name_pattern)
 
         if not args.ignore_info:
-            window.subscribeInfo(args.info_mac_pattern, args.info_service_pattern, args.info_category_pattern, args.info_name_pattern)
+            window.subscribeInfo(args.info_mac_pattern, args.info_service_pattern, args.info_category_pattern, args.info_name_pattern, args.info_max_rate)
+
+        for pattern in args.pin:
+            if not window.setInfoRenderPolicy(name=pattern, pinned=True):
+                parser.error("invalid --pin pattern: " + pattern)
+
+        if args.cache:
+            window.setTopologyCache(args.cache)
 
         window.show()
 
+        if replay:
+            def printReplayStats():
+                print("events: %d, events/s: %.1f, gui lag: %.1f ms (max %.1f ms)%s" % (replay.eventCount, replay.eventsPerSecond,
+                    replay.guiLag * 1000, replay.maxGuiLag * 1000, ", finished" if replay.finished else ""))
+            stats_timer = QTimer()
+            stats_timer.timeout.connect(printReplayStats)
+            stats_timer.start(1000)
+
         app.exec()
         del window
+        d2dcnWidget.disableTracing()
 
     except KeyboardInterrupt:
         pass
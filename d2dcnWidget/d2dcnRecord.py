@@ -0,0 +1,601 @@
+#
+# This file is part of the d2dcnWidget distribution.
+# Copyright (c) 2023 Javier Moreno Garcia.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+from .d2dcnWidget import container, subscriptionFilter, objectResolver, readerDispatch
+
+from PyQt5.QtCore import QObject, QEvent, QCoreApplication
+
+import weakref
+import threading
+import itertools
+import struct
+import time
+import zlib
+import os
+import re
+
+import d2dcn
+
+
+class valueLog():
+
+    MAGIC = b"D2DLOG"
+    VERSION = 1
+
+    RAW_CHUNK = 0
+    ZLIB_CHUNK = 1
+
+    INFO_RECORD = 1
+    VALUE_RECORD = 2
+    REMOVE_RECORD = 3
+
+    INFO_SEPARATOR = "\0"
+
+    FILE_HEADER = struct.Struct("<6sB")
+    CHUNK_HEADER = struct.Struct("<BII")
+    RECORD_LENGTH = struct.Struct("<I")
+    RECORD_HEADER = struct.Struct("<BId")
+
+
+class valueLogWriter():
+
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, path, compress=False, block_size=BLOCK_SIZE):
+        self.__mutex = threading.Lock()
+        self.__compress = compress
+        self.__block_size = block_size
+        self.__buffer = bytearray()
+        self.__info_ids = {}
+        self.__next_id = itertools.count()
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) < valueLog.FILE_HEADER.size
+        if not new_file:
+            with open(path, "rb") as log_file:
+                magic, version = valueLog.FILE_HEADER.unpack(log_file.read(valueLog.FILE_HEADER.size))
+                if magic != valueLog.MAGIC or version != valueLog.VERSION:
+                    raise ValueError("Not a d2dcn value log: " + path)
+                valid_length = valueLogWriter.__validLength(log_file)
+
+            # A recorder killed mid chunk leaves a torn tail that would hide everything appended after it
+            if valid_length < os.path.getsize(path):
+                os.truncate(path, valid_length)
+
+        elif os.path.exists(path):
+            os.truncate(path, 0)
+
+        self.__file = open(path, "ab")
+        if new_file:
+            self.__file.write(valueLog.FILE_HEADER.pack(valueLog.MAGIC, valueLog.VERSION))
+
+
+    def __del__(self):
+        self.close()
+
+
+    def __validLength(log_file):
+        file_size = os.fstat(log_file.fileno()).st_size
+        offset = valueLog.FILE_HEADER.size
+        while offset + valueLog.CHUNK_HEADER.size <= file_size:
+            log_file.seek(offset)
+            kind, stored_length, raw_length = valueLog.CHUNK_HEADER.unpack(log_file.read(valueLog.CHUNK_HEADER.size))
+            if kind not in [valueLog.RAW_CHUNK, valueLog.ZLIB_CHUNK] or offset + valueLog.CHUNK_HEADER.size + stored_length > file_size:
+                break
+            offset += valueLog.CHUNK_HEADER.size + stored_length
+        return offset
+
+
+    def __append(self, record_type, info_id, timestamp, body=b""):
+        payload = valueLog.RECORD_HEADER.pack(record_type, info_id, timestamp) + body
+        self.__buffer += valueLog.RECORD_LENGTH.pack(len(payload))
+        self.__buffer += payload
+        if len(self.__buffer) >= self.__block_size:
+            self.__flushBuffer()
+
+
+    def __infoId(self, info, timestamp):
+        uid = d2dcn.d2d.createInfoWriterUID(info.mac, info.service, info.category, info.name)
+        info_id = self.__info_ids.get(uid)
+        if info_id == None:
+            # Never reuse IDs, counting the live infos after a remove hands out one still in use
+            info_id = next(self.__next_id)
+            self.__info_ids[uid] = info_id
+            fields = [info.mac, info.service, info.category, info.name, info.valueType]
+            self.__append(valueLog.INFO_RECORD, info_id, timestamp, valueLog.INFO_SEPARATOR.join(fields).encode())
+        return info_id
+
+
+    def writeValue(self, info, value, timestamp=None):
+        if timestamp == None:
+            timestamp = time.time()
+
+        ascii_value = d2dcn.typeTools.convertToASCII(value, info.valueType) if value != None else None
+        body = b"\x00" if ascii_value == None else b"\x01" + ascii_value.encode()
+
+        with self.__mutex:
+            if self.__file:
+                self.__append(valueLog.VALUE_RECORD, self.__infoId(info, timestamp), timestamp, body)
+
+
+    def writeRemove(self, mac, service, category, name, timestamp=None):
+        if timestamp == None:
+            timestamp = time.time()
+
+        uid = d2dcn.d2d.createInfoWriterUID(mac, service, category, name)
+        with self.__mutex:
+            if self.__file and uid in self.__info_ids:
+                self.__append(valueLog.REMOVE_RECORD, self.__info_ids.pop(uid), timestamp)
+
+
+    def __flushBuffer(self):
+        if len(self.__buffer) == 0:
+            return
+
+        raw = bytes(self.__buffer)
+        self.__buffer = bytearray()
+        if self.__compress:
+            data = zlib.compress(raw)
+            self.__file.write(valueLog.CHUNK_HEADER.pack(valueLog.ZLIB_CHUNK, len(data), len(raw)))
+            self.__file.write(data)
+        else:
+            self.__file.write(valueLog.CHUNK_HEADER.pack(valueLog.RAW_CHUNK, len(raw), len(raw)))
+            self.__file.write(raw)
+
+
+    def flush(self):
+        with self.__mutex:
+            if self.__file:
+                self.__flushBuffer()
+                self.__file.flush()
+
+
+    def close(self):
+        with self.__mutex:
+            if self.__file:
+                self.__flushBuffer()
+                self.__file.close()
+                self.__file = None
+
+
+class valueLogReader():
+
+    def __init__(self, path):
+        self.__path = path
+
+
+    def records(self):
+        infos = {}
+        with open(self.__path, "rb") as log_file:
+            magic, version = valueLog.FILE_HEADER.unpack(log_file.read(valueLog.FILE_HEADER.size))
+            if magic != valueLog.MAGIC or version != valueLog.VERSION:
+                raise ValueError("Not a d2dcn value log: " + self.__path)
+
+            while True:
+                header = log_file.read(valueLog.CHUNK_HEADER.size)
+                if len(header) < valueLog.CHUNK_HEADER.size:
+                    return
+
+                kind, stored_length, raw_length = valueLog.CHUNK_HEADER.unpack(header)
+                data = log_file.read(stored_length)
+                if len(data) < stored_length:
+                    return
+
+                if kind == valueLog.ZLIB_CHUNK:
+                    data = zlib.decompress(data)
+
+                offset = 0
+                while offset < len(data):
+                    length, = valueLog.RECORD_LENGTH.unpack_from(data, offset)
+                    offset += valueLog.RECORD_LENGTH.size
+                    record_type, info_id, timestamp = valueLog.RECORD_HEADER.unpack_from(data, offset)
+                    body = data[offset + valueLog.RECORD_HEADER.size:offset + length]
+                    offset += length
+
+                    if record_type == valueLog.INFO_RECORD:
+                        info = container()
+                        info.mac, info.service, info.category, info.name, info.valueType = body.decode().split(valueLog.INFO_SEPARATOR)
+                        infos[info_id] = info
+                        yield record_type, timestamp, info, None
+
+                    elif record_type == valueLog.VALUE_RECORD:
+                        info = infos[info_id]
+                        value = d2dcn.typeTools.convevertFromASCII(body[1:].decode(), info.valueType) if body[:1] == b"\x01" else None
+                        yield record_type, timestamp, info, value
+
+                    elif record_type == valueLog.REMOVE_RECORD:
+                        yield record_type, timestamp, infos.pop(info_id), None
+
+
+class d2dcnRecorder():
+
+    FLUSH_PERIOD = 1
+
+    def __init__(self, writer, client=None):
+        self.__writer = writer
+        self.__d2dcn_client = client if client else d2dcn.d2d(start=False)
+        self.__resolver = objectResolver(self.__d2dcn_client)
+        self.__info_filter = subscriptionFilter()
+        self.__mutex = threading.Lock()
+        self.__readers = {}
+        self.__subscriptions = {}
+        self.__run = False
+        self.__flush_thread = None
+
+        self.__d2dcn_client.onInfoAdd = lambda mac, service, category, name, weak_ptr=weakref.ref(self) : d2dcnRecorder.__on_info_add(mac, service, category, name, weak_ptr)
+        self.__d2dcn_client.onInfoUpdate = lambda mac, service, category, name, weak_ptr=weakref.ref(self) : d2dcnRecorder.__on_info_add(mac, service, category, name, weak_ptr)
+        self.__d2dcn_client.onInfoRemove = lambda mac, service, category, name, weak_ptr=weakref.ref(self) : d2dcnRecorder.__on_info_remove(mac, service, category, name, weak_ptr)
+
+
+    def __del__(self):
+        self.stop()
+
+
+    def __on_info_add(mac, service, category, name, weak_ptr):
+        shared_ptr = weak_ptr()
+        if shared_ptr:
+            uid = d2dcn.d2d.createInfoWriterUID(mac, service, category, name)
+            if shared_ptr.__info_filter.match(uid):
+                shared_ptr.__resolver.resolveInfo(mac, service, category, name, lambda info, weak_ptr=weak_ptr : d2dcnRecorder.__attach(info, weak_ptr))
+
+
+    def __on_info_remove(mac, service, category, name, weak_ptr):
+        shared_ptr = weak_ptr()
+        if shared_ptr:
+            shared_ptr.__resolver.forgetInfo(mac, service, category, name)
+            uid = d2dcn.d2d.createInfoWriterUID(mac, service, category, name)
+            shared_ptr.__info_filter.forget(uid)
+            with shared_ptr.__mutex:
+                shared_ptr.__readers.pop(uid, None)
+                subscription = shared_ptr.__subscriptions.pop(uid, None)
+                if subscription:
+                    subscription.detach()
+            shared_ptr.__writer.writeRemove(mac, service, category, name)
+
+
+    def __attach(info, weak_ptr):
+        shared_ptr = weak_ptr()
+        if shared_ptr:
+            uid = d2dcn.d2d.createInfoWriterUID(info.mac, info.service, info.category, info.name)
+            with shared_ptr.__mutex:
+                if shared_ptr.__readers.get(uid) is info:
+                    return
+
+                shared_ptr.__readers[uid] = info
+                previous = shared_ptr.__subscriptions.pop(uid, None)
+                if previous:
+                    previous.detach()
+                shared_ptr.__subscriptions[uid] = readerDispatch.instance().attach(info,
+                    lambda info, weak_ptr=weak_ptr : d2dcnRecorder.__update_callback(info, weak_ptr))
+
+            if info.value != None:
+                shared_ptr.__writer.writeValue(info, info.value)
+
+
+    def __update_callback(info, weak_ptr):
+        shared_ptr = weak_ptr()
+        if shared_ptr:
+            shared_ptr.__writer.writeValue(info, info.value)
+
+
+    def __flush_thread_loop(weak_ptr):
+        while True:
+            time.sleep(d2dcnRecorder.FLUSH_PERIOD)
+            shared_ptr = weak_ptr()
+            if not shared_ptr or not shared_ptr.__run:
+                return
+            shared_ptr.__writer.flush()
+            del shared_ptr
+
+
+    def subscribeInfo(self, mac:str="", service:str="", category="", name:str="") -> bool:
+        return self.__info_filter.add(d2dcn.d2d.createInfoWriterUID(mac, service, category, name))
+
+
+    def start(self):
+        if self.__run:
+            return
+
+        self.__run = True
+        self.__d2dcn_client.start()
+        self.__flush_thread = threading.Thread(target=d2dcnRecorder.__flush_thread_loop, daemon=True, args=[weakref.ref(self)])
+        self.__flush_thread.start()
+
+
+    def stop(self):
+        if not self.__run:
+            return
+
+        self.__run = False
+        self.__d2dcn_client.stop()
+        with self.__mutex:
+            self.__readers.clear()
+            for subscription in self.__subscriptions.values():
+                subscription.detach()
+            self.__subscriptions.clear()
+        self.__writer.flush()
+
+
+    @property
+    def infoCount(self):
+        with self.__mutex:
+            return len(self.__readers)
+
+
+class replayInfoReader():
+
+    def __init__(self, mac, service, category, name, valueType):
+        self.__mac = mac
+        self.__service = service
+        self.__category = category
+        self.__name = name
+        self.__valueType = valueType
+        self.__value = None
+        self.__epoch = 0
+        self.__mutex = threading.RLock()
+        self.__callbacks = []
+
+
+    def setValue(self, value, epoch):
+        with self.__mutex:
+            self.__value = value
+            self.__epoch = int(epoch)
+
+            remove_list = []
+            for weak_callback in self.__callbacks:
+                callback = weak_callback()
+                if callback:
+                    callback()
+                else:
+                    remove_list.append(weak_callback)
+
+            for weak_callback in remove_list:
+                self.__callbacks.remove(weak_callback)
+
+
+    def addOnUpdateCallback(self, callback):
+        weak_ptr = weakref.ref(callback)
+        with self.__mutex:
+            if weak_ptr not in self.__callbacks:
+                self.__callbacks.append(weak_ptr)
+
+
+    @property
+    def name(self):
+        return self.__name
+
+
+    @property
+    def mac(self):
+        return self.__mac
+
+
+    @property
+    def ip(self):
+        return ""
+
+
+    @property
+    def service(self):
+        return self.__service
+
+
+    @property
+    def category(self):
+        return self.__category
+
+
+    @property
+    def value(self):
+        with self.__mutex:
+            return self.__value
+
+
+    @property
+    def valueType(self):
+        return self.__valueType
+
+
+    @property
+    def epoch(self):
+        with self.__mutex:
+            return self.__epoch
+
+
+    @property
+    def online(self):
+        return self.value != None
+
+
+class replayLagProbe(QObject):
+
+    class probeEvent(QEvent):
+        def __init__(self):
+            super().__init__(QEvent.User)
+            self.posted = time.monotonic()
+
+    def __init__(self):
+        super().__init__()
+        self.__mutex = threading.Lock()
+        self.__lag = 0
+        self.__max_lag = 0
+
+
+    def probe(self):
+        QCoreApplication.postEvent(self, replayLagProbe.probeEvent())
+
+
+    def event(self, event):
+        if isinstance(event, replayLagProbe.probeEvent):
+            lag = time.monotonic() - event.posted
+            with self.__mutex:
+                self.__lag = lag
+                self.__max_lag = max(self.__max_lag, lag)
+            return True
+
+        return super().event(event)
+
+
+    @property
+    def lag(self):
+        with self.__mutex:
+            return self.__lag
+
+
+    @property
+    def maxLag(self):
+        with self.__mutex:
+            return self.__max_lag
+
+
+class d2dcnReplay():
+
+    AS_FAST_AS_POSSIBLE = 0
+    REAL_TIME = 1
+    PROBE_PERIOD = 0.1
+
+    def __init__(self, path, speed=REAL_TIME):
+        self.__log_reader = valueLogReader(path)
+        self.__speed = speed
+        self.__mutex = threading.Lock()
+        self.__readers = {}
+        self.__run = False
+        self.__thread = None
+        self.__event_count = 0
+        self.__start_time = None
+        self.__end_time = None
+        self.__lag_probe = replayLagProbe() if QCoreApplication.instance() else None
+
+        self.onCommandAdd = None
+        self.onCommandUpdate = None
+        self.onCommandRemove = None
+        self.onInfoAdd = None
+        self.onInfoUpdate = None
+        self.onInfoRemove = None
+
+
+    def __del__(self):
+        self.stop()
+
+
+    def __replay_thread(weak_ptr, records):
+        first_timestamp = None
+        next_probe = 0
+        for record_type, timestamp, info, value in records:
+            shared_ptr = weak_ptr()
+            if not shared_ptr or not shared_ptr.__run:
+                return
+
+            if first_timestamp == None:
+                first_timestamp = timestamp
+
+            if shared_ptr.__speed > 0:
+                delay = shared_ptr.__start_time + (timestamp - first_timestamp) / shared_ptr.__speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            uid = d2dcn.d2d.createInfoWriterUID(info.mac, info.service, info.category, info.name)
+            if record_type == valueLog.INFO_RECORD:
+                with shared_ptr.__mutex:
+                    known = uid in shared_ptr.__readers
+                    if not known:
+                        shared_ptr.__readers[uid] = replayInfoReader(info.mac, info.service, info.category, info.name, info.valueType)
+                if not known and shared_ptr.onInfoAdd:
+                    shared_ptr.onInfoAdd(info.mac, info.service, info.category, info.name)
+
+            elif record_type == valueLog.VALUE_RECORD:
+                with shared_ptr.__mutex:
+                    reader = shared_ptr.__readers.get(uid)
+                if reader:
+                    reader.setValue(value, timestamp)
+
+            elif record_type == valueLog.REMOVE_RECORD:
+                with shared_ptr.__mutex:
+                    shared_ptr.__readers.pop(uid, None)
+                if shared_ptr.onInfoRemove:
+                    shared_ptr.onInfoRemove(info.mac, info.service, info.category, info.name)
+
+            with shared_ptr.__mutex:
+                shared_ptr.__event_count += 1
+
+            if shared_ptr.__lag_probe and time.monotonic() >= next_probe:
+                shared_ptr.__lag_probe.probe()
+                next_probe = time.monotonic() + d2dcnReplay.PROBE_PERIOD
+
+            del shared_ptr
+
+        shared_ptr = weak_ptr()
+        if shared_ptr:
+            with shared_ptr.__mutex:
+                shared_ptr.__end_time = time.monotonic()
+
+
+    def getAvailableInfoReaders(self, name:str="", service:str="", category:str="", mac:str="", wait:int=0) -> list:
+        search_info_path = d2dcn.d2d.createInfoWriterUID(mac, service, category, name)
+        with self.__mutex:
+            return [self.__readers[uid] for uid in self.__readers if re.search(search_info_path, uid)]
+
+
+    def getAvailableComands(self, name:str="", service:str="", category:str="", mac:str="", wait:int=0) -> list:
+        return []
+
+
+    def start(self):
+        if self.__run:
+            return
+
+        self.__run = True
+        self.__start_time = time.monotonic()
+        self.__thread = threading.Thread(target=d2dcnReplay.__replay_thread, daemon=True, args=[weakref.ref(self), self.__log_reader.records()])
+        self.__thread.start()
+
+
+    def stop(self):
+        self.__run = False
+        if self.__thread and self.__thread != threading.current_thread():
+            self.__thread.join()
+        self.__thread = None
+
+
+    @property
+    def finished(self):
+        with self.__mutex:
+            return self.__end_time != None
+
+
+    @property
+    def eventCount(self):
+        with self.__mutex:
+            return self.__event_count
+
+
+    @property
+    def eventsPerSecond(self):
+        with self.__mutex:
+            if self.__start_time == None:
+                return 0
+            elapsed = (self.__end_time if self.__end_time != None else time.monotonic()) - self.__start_time
+            return self.__event_count / elapsed if elapsed > 0 else 0
+
+
+    @property
+    def guiLag(self):
+        return self.__lag_probe.lag if self.__lag_probe else 0
+
+
+    @property
+    def maxGuiLag(self):
+        return self.__lag_probe.maxLag if self.__lag_probe else 0
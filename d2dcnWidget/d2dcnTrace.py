@@ -0,0 +1,182 @@
+#
+# This file is part of the d2dcnWidget distribution.
+# Copyright (c) 2023 Javier Moreno Garcia.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 3.
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+from PyQt5.QtCore import QCoreApplication
+
+from .d2dcnWidget import d2dcnWidget, objectResolver, serviceView, infoTableView, fieldOutput, commandExecution
+
+import functools
+import threading
+import weakref
+import atexit
+import json
+import time
+import os
+
+
+TRACE_ENV = "D2DCN_TRACE"
+
+
+class chromeTracer():
+
+    MAX_BUFFERED_SPANS = 4096
+    FLUSH_PERIOD = 1
+
+    # (owner, attribute, span name, category)
+    TRACE_POINTS = [
+        (d2dcnWidget, "_d2dcnWidget__on_info_add", "d2dcnWidget.onInfoAdd", "d2dcn"),
+        (d2dcnWidget, "_d2dcnWidget__on_info_update", "d2dcnWidget.onInfoUpdate", "d2dcn"),
+        (d2dcnWidget, "_d2dcnWidget__on_command_update", "d2dcnWidget.onCommandUpdate", "d2dcn"),
+        (objectResolver, "_objectResolver__resolveJob", "objectResolver.lookup", "d2dcn"),
+        (QCoreApplication, "postEvent", "QCoreApplication.postEvent", "qt"),
+        (serviceView, "event", "serviceView.event", "gui"),
+        (serviceView, "_serviceView__applyPendingEvents", "serviceView.applyBatch", "gui"),
+        (infoTableView, "event", "infoTableView.event", "gui"),
+        (fieldOutput, "update", "fieldOutput.update", "gui"),
+        (commandExecution, "runCommand", "commandExecution.runCommand", "gui"),
+    ]
+
+    def __init__(self, path):
+        self.__mutex = threading.Lock()
+        self.__spans = []
+        self.__thread_names = {}
+        self.__named_threads = set()
+        self.__originals = []
+        self.__pid = os.getpid()
+        self.__origin = time.perf_counter_ns()
+        self.__span_count = 0
+        self.__run = False
+
+        # JSON array format, viewers accept it without the closing bracket so a crash keeps what was flushed
+        self.__file = open(path, "w")
+        self.__file.write("[")
+        self.__separator = "\n"
+
+
+    def __span(self, name, category, start, end):
+        tid = threading.get_ident()
+        with self.__mutex:
+            if tid not in self.__thread_names:
+                self.__thread_names[tid] = threading.current_thread().name
+            self.__spans.append((name, category, start, end, tid))
+            self.__span_count += 1
+            full = len(self.__spans) >= chromeTracer.MAX_BUFFERED_SPANS
+
+        if full:
+            self.flush()
+
+
+    def __wrap(self, original, name, category):
+        @functools.wraps(original)
+        def traced(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.__span(name, category, start, time.perf_counter_ns())
+        return traced
+
+
+    def __flush_thread_loop(weak_ptr):
+        while True:
+            time.sleep(chromeTracer.FLUSH_PERIOD)
+            shared_ptr = weak_ptr()
+            if not shared_ptr or not shared_ptr.__run:
+                return
+            shared_ptr.flush()
+            del shared_ptr
+
+
+    def install(self):
+        for owner, attribute, name, category in chromeTracer.TRACE_POINTS:
+            original = getattr(owner, attribute)
+            self.__originals.append((owner, attribute, original))
+            setattr(owner, attribute, self.__wrap(original, name, category))
+
+        self.__run = True
+        threading.Thread(target=chromeTracer.__flush_thread_loop, daemon=True, args=[weakref.ref(self)]).start()
+
+
+    def uninstall(self):
+        self.__run = False
+        for owner, attribute, original in reversed(self.__originals):
+            setattr(owner, attribute, original)
+        self.__originals = []
+
+
+    def flush(self):
+        with self.__mutex:
+            if self.__file == None:
+                return
+
+            spans = self.__spans
+            self.__spans = []
+            events = []
+            for tid, thread_name in self.__thread_names.items():
+                if tid not in self.__named_threads:
+                    self.__named_threads.add(tid)
+                    events.append({"name": "thread_name", "ph": "M", "pid": self.__pid, "tid": tid, "args": {"name": thread_name}})
+
+            for name, category, start, end, tid in spans:
+                events.append({"name": name, "cat": category, "ph": "X", "pid": self.__pid, "tid": tid,
+                    "ts": (start - self.__origin) / 1000, "dur": (end - start) / 1000})
+
+            for event in events:
+                self.__file.write(self.__separator + json.dumps(event))
+                self.__separator = ",\n"
+            self.__file.flush()
+
+
+    def close(self):
+        self.flush()
+        with self.__mutex:
+            if self.__file:
+                self.__file.write("\n]\n")
+                self.__file.close()
+                self.__file = None
+
+
+    @property
+    def spanCount(self):
+        with self.__mutex:
+            return self.__span_count
+
+
+__tracer = None
+
+
+def enableTracing(path:str=None) -> chromeTracer:
+    global __tracer
+
+    if path == None:
+        path = os.environ.get(TRACE_ENV)
+    if not path or __tracer:
+        return __tracer
+
+    __tracer = chromeTracer(path)
+    __tracer.install()
+    atexit.register(disableTracing)
+    return __tracer
+
+
+def disableTracing():
+    global __tracer
+
+    if __tracer:
+        __tracer.uninstall()
+        __tracer.close()
+        __tracer = None
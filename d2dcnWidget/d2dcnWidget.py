@@ -15,18 +15,35 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 #
 
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSizePolicy, QPushButton, QTabWidget, QFrame, QCheckBox, QDoubleSpinBox, QSpinBox, QLineEdit, QScrollArea
-from PyQt5.QtCore import Qt, QEvent, QCoreApplication, QEventLoop, pyqtSignal, QTimer, QRegularExpression
-from PyQt5.QtGui import QFontMetrics, QRegularExpressionValidator
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSizePolicy, QPushButton, QTabWidget, QFrame, QCheckBox, QDoubleSpinBox, QSpinBox, QLineEdit, QScrollArea, QTableView, QHeaderView, QSplitter, QPlainTextEdit, QAction, QFormLayout, QTableWidget, QTableWidgetItem
+from PyQt5.QtCore import Qt, QObject, QEvent, QCoreApplication, pyqtSignal, QTimer, QRegularExpression, QAbstractTableModel, QSortFilterProxyModel, QModelIndex, QRect, QPoint, QPointF
+from PyQt5 import sip
+from PyQt5.QtGui import QFontMetrics, QRegularExpressionValidator, QPainter, QPolygonF
 
 import weakref
 import re
+import threading
+import time
+import concurrent.futures
+import itertools
+import bisect
+import array
+import sys
+import json
+import collections
+import zlib
+import os
 
 import d2dcn
 
 
 version = "0.2.0"
 
+
+class container():
+    pass
+
+
 class QHLine(QFrame):
     def __init__(self):
         super(QHLine, self).__init__()
@@ -35,128 +52,1271 @@ class QHLine(QFrame):
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
 
 
-class QVLine(QFrame):
-    def __init__(self):
-        super(QVLine, self).__init__()
-        self.setFrameShape(QFrame.VLine)
-        self.setFrameShadow(QFrame.Sunken)
-        self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Expanding)
+class QVLine(QFrame):
+    def __init__(self):
+        super(QVLine, self).__init__()
+        self.setFrameShape(QFrame.VLine)
+        self.setFrameShadow(QFrame.Sunken)
+        self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Expanding)
+
+
+class perfCounters():
+
+    TOPOLOGY_CALLBACKS = "topology_callbacks"
+    VALUE_CALLBACKS = "value_callbacks"
+    EVENTS_POSTED = "events_posted"
+    EVENTS_PROCESSED = "events_processed"
+    COALESCED_UPDATES = "coalesced_updates"
+    DROPPED_UPDATES = "dropped_updates"
+    DEFERRED_UPDATES = "deferred_updates"
+    UNCHANGED_UPDATES = "unchanged_updates"
+    FILTER_ACCEPTED = "filter_accepted"
+    FILTER_REJECTED = "filter_rejected"
+
+    RATE_WINDOW = 1
+    LATENCY_SAMPLES = 2048
+
+    __instance = None
+
+    def instance():
+        if perfCounters.__instance == None:
+            perfCounters.__instance = perfCounters()
+        return perfCounters.__instance
+
+
+    def __init__(self):
+        self.__mutex = threading.Lock()
+        self.__counters = dict.fromkeys([perfCounters.TOPOLOGY_CALLBACKS, perfCounters.VALUE_CALLBACKS, perfCounters.EVENTS_POSTED,
+            perfCounters.EVENTS_PROCESSED, perfCounters.COALESCED_UPDATES, perfCounters.DROPPED_UPDATES,
+            perfCounters.DEFERRED_UPDATES, perfCounters.UNCHANGED_UPDATES, perfCounters.FILTER_ACCEPTED, perfCounters.FILTER_REJECTED], 0)
+        self.__latencies = collections.deque(maxlen=perfCounters.LATENCY_SAMPLES)
+        self.__timers = weakref.WeakSet()
+        self.__rate_time = time.monotonic()
+        self.__rate_base = dict(self.__counters)
+        self.__rates = dict.fromkeys(self.__counters, 0)
+
+
+    def count(self, name, amount=1):
+        with self.__mutex:
+            self.__counters[name] += amount
+
+
+    def addLatencies(self, latencies):
+        with self.__mutex:
+            self.__latencies.extend(latencies)
+
+
+    def trackTimer(self, timer):
+        self.__timers.add(timer)
+
+
+    def activeTimers(self):
+        active = 0
+        for timer in list(self.__timers):
+            try:
+                active += timer.isActive()
+            except RuntimeError:
+                pass
+        return active
+
+
+    def __percentile(ordered, fraction):
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else None
+
+
+    def snapshot(self) -> dict:
+        with self.__mutex:
+            now = time.monotonic()
+            if now - self.__rate_time >= perfCounters.RATE_WINDOW:
+                for name in self.__counters:
+                    self.__rates[name] = (self.__counters[name] - self.__rate_base[name]) / (now - self.__rate_time)
+                self.__rate_base = dict(self.__counters)
+                self.__rate_time = now
+
+            counters = dict(self.__counters)
+            for name in self.__rates:
+                counters[name + "_per_second"] = self.__rates[name]
+            latencies = sorted(self.__latencies)
+
+        filtered = counters[perfCounters.FILTER_ACCEPTED] + counters[perfCounters.FILTER_REJECTED]
+        counters["filter_rejection_ratio"] = counters[perfCounters.FILTER_REJECTED] / filtered if filtered else 0
+        counters["latency_p50"] = perfCounters.__percentile(latencies, 0.5)
+        counters["latency_p99"] = perfCounters.__percentile(latencies, 0.99)
+        counters["active_timers"] = self.activeTimers()
+        return counters
+
+
+class updateDispatcher(QObject):
+
+    DEFAULT_FLUSH_RATE = 30
+    DEFAULT_RENDER_BUDGET = 0
+    MAX_CACHED_POLICIES = 65536
+
+    __instance = None
+
+    class flushRequestEvent(QEvent):
+        def __init__(self):
+            super().__init__(QEvent.User)
+
+
+    def instance():
+        if updateDispatcher.__instance == None:
+            updateDispatcher.__instance = updateDispatcher()
+        return updateDispatcher.__instance
+
+
+    def __init__(self, flush_rate=DEFAULT_FLUSH_RATE, render_budget=DEFAULT_RENDER_BUDGET):
+        super().__init__()
+        self.__mutex = threading.Lock()
+        self.__dirty = {}
+        self.__flush_requested = False
+        self.__last_flush = 0
+        self.__last_render = {}
+        self.__policies = ([], {})
+
+        self.__flush_timer = QTimer(self)
+        self.__flush_timer.setSingleShot(True)
+        self.__flush_timer.timeout.connect(self.flush)
+        perfCounters.instance().trackTimer(self.__flush_timer)
+
+        self.setFlushRate(flush_rate)
+        self.setRenderBudget(render_budget)
+
+
+    def setFlushRate(self, flush_rate):
+        self.__flush_interval = 1 / flush_rate if flush_rate > 0 else 0
+
+
+    def setRenderBudget(self, render_budget):
+        self.__render_budget = max(int(render_budget), 0)
+
+
+    def setRenderPolicy(self, pattern, max_rate=0, pinned=False) -> bool:
+        try:
+            matcher = re.compile(pattern)
+        except re.error:
+            return False
+
+        # The most recently set matching policy wins, setting the defaults removes it
+        rules = [rule for rule in self.__policies[0] if rule[0] != pattern]
+        if max_rate > 0 or pinned:
+            rules.append((pattern, matcher, 1 / max_rate if max_rate > 0 else 0, pinned))
+
+        self.__policies = (rules, {})
+        self.__last_render = {}
+        return True
+
+
+    def forget(self, uid):
+        self.__policies[1].pop(uid, None)
+        self.__last_render.pop(uid, None)
+
+
+    @property
+    def cacheSize(self):
+        return len(self.__policies[1]) + len(self.__last_render)
+
+
+    def renderPolicy(self, uid):
+        rules, cache = self.__policies
+        policy = cache.get(uid)
+        if policy == None:
+            policy = next(((interval, pinned) for pattern, matcher, interval, pinned in reversed(rules) if matcher.search(uid)), (0, False))
+            if len(cache) >= updateDispatcher.MAX_CACHED_POLICIES:
+                cache.clear()
+            cache[uid] = policy
+        return policy
+
+
+    def push(self, uid, target, value):
+        counters = perfCounters.instance()
+        counters.count(perfCounters.VALUE_CALLBACKS)
+        # Several outputs may show the same info, coalesce per output so none of them is starved
+        key = (uid, id(target))
+        with self.__mutex:
+            pending = self.__dirty.get(key)
+            if pending != None:
+                counters.count(perfCounters.COALESCED_UPDATES)
+
+            # Latency is measured from the oldest change still waiting to be shown
+            self.__dirty[key] = (weakref.ref(target), value, pending[2] if pending != None else time.monotonic())
+            if self.__flush_requested:
+                return
+            self.__flush_requested = True
+
+        counters.count(perfCounters.EVENTS_POSTED)
+        QCoreApplication.postEvent(self, updateDispatcher.flushRequestEvent())
+
+
+    def pendingCount(self):
+        with self.__mutex:
+            return len(self.__dirty)
+
+
+    def event(self, event):
+        if isinstance(event, updateDispatcher.flushRequestEvent):
+            perfCounters.instance().count(perfCounters.EVENTS_PROCESSED)
+            wait = self.__last_flush + self.__flush_interval - time.monotonic()
+
+            # A flush may already be scheduled later for rate limited values only
+            if not self.__flush_timer.isActive() or self.__flush_timer.remainingTime() > wait * 1000:
+                if wait > 0:
+                    self.__flush_timer.start(int(wait * 1000))
+                else:
+                    self.__flush_timer.stop()
+                    self.flush()
+
+        else:
+            return super().event(event)
+
+        return True
+
+
+    def flush(self):
+        with self.__mutex:
+            dirty = self.__dirty
+            self.__dirty = {}
+            self.__flush_requested = False
+
+        now = time.monotonic()
+        self.__last_flush = now
+        pinned_keys = []
+        keys = []
+        deferred = {}
+        next_due = None
+        dropped = 0
+        for key in dirty:
+            # Values of removed objects must not refill the per UID caches
+            if dirty[key][0]() == None:
+                dropped += 1
+                continue
+
+            interval, pinned = self.renderPolicy(key[0])
+            if interval > 0:
+                due = self.__last_render.get(key[0], 0) + interval
+                if due > now:
+                    deferred[key] = dirty[key]
+                    next_due = due if next_due == None else min(next_due, due)
+                    continue
+            (pinned_keys if pinned else keys).append(key)
+
+        # Over budget, pinned values go first and the rest are served oldest first
+        if self.__render_budget > 0 and len(pinned_keys) + len(keys) > self.__render_budget:
+            pinned_keys.sort(key=lambda key : dirty[key][2])
+            keys.sort(key=lambda key : dirty[key][2])
+            keys = pinned_keys + keys
+            for key in keys[self.__render_budget:]:
+                deferred[key] = dirty[key]
+            keys = keys[:self.__render_budget]
+            next_due = now
+
+        else:
+            keys = pinned_keys + keys
+
+        latencies = []
+        for key in keys:
+            uid = key[0]
+            weak_target, value, pushed = dirty[key]
+            target = weak_target()
+            if target:
+                target.dispatchUpdate(uid, value)
+                latencies.append(time.monotonic() - pushed)
+                if self.renderPolicy(uid)[0] > 0:
+                    if len(self.__last_render) >= updateDispatcher.MAX_CACHED_POLICIES:
+                        self.__last_render = {}
+                    self.__last_render[uid] = now
+            else:
+                dropped += 1
+
+        counters = perfCounters.instance()
+        counters.addLatencies(latencies)
+        if dropped:
+            counters.count(perfCounters.DROPPED_UPDATES, dropped)
+
+        if deferred:
+            counters.count(perfCounters.DEFERRED_UPDATES, len(deferred))
+            with self.__mutex:
+                for key in deferred:
+                    newer = self.__dirty.get(key)
+                    self.__dirty[key] = deferred[key] if newer == None else (newer[0], newer[1], deferred[key][2])
+
+            wait = max(next_due - time.monotonic(), self.__flush_interval)
+            if not self.__flush_timer.isActive() or self.__flush_timer.remainingTime() > wait * 1000:
+                self.__flush_timer.start(int(wait * 1000) + 1)
+
+
+class readerSubscription():
+
+    def __init__(self, dispatch, reader, token):
+        self.__dispatch = dispatch
+        self.__reader = reader
+        self.__token = token
+
+
+    def __del__(self):
+        self.detach()
+
+
+    def detach(self):
+        if self.__reader != None:
+            self.__dispatch.detach(self.__reader, self.__token)
+            self.__reader = None
+
+
+class readerDispatch():
+
+    __instance = None
+
+    def instance():
+        if readerDispatch.__instance == None:
+            readerDispatch.__instance = readerDispatch()
+        return readerDispatch.__instance
+
+
+    def __init__(self):
+        # Subscriptions detach from __del__, which may run on any allocation made while the lock is held
+        self.__mutex = threading.RLock()
+        self.__entries = {}
+        self.__tokens = itertools.count()
+
+
+    def __fan_out(weak_entry):
+        entry = weak_entry()
+        if entry:
+            # Observer maps are replaced, never modified, so this snapshot needs no lock
+            for observer in entry.observers.values():
+                observer(entry.reader)
+
+
+    def __newEntry(reader):
+        entry = container()
+        entry.reader = reader
+        entry.observers = {}
+        entry.callback = lambda weak_entry=weakref.ref(entry) : readerDispatch.__fan_out(weak_entry)
+        reader.addOnUpdateCallback(entry.callback)
+        return entry
+
+
+    def attach(self, reader, observer) -> readerSubscription:
+        token = next(self.__tokens)
+        created = None
+        while True:
+            with self.__mutex:
+                entry = self.__entries.get(id(reader))
+                if entry == None and created != None:
+                    entry = created
+                    self.__entries[id(reader)] = entry
+
+                if entry != None:
+                    # Only publish over the map we copied, a re-entrant detach may have replaced it meanwhile
+                    current = entry.observers
+                    observers = dict(current)
+                    observers[token] = observer
+                    if self.__entries.get(id(reader)) is entry and entry.observers is current:
+                        entry.observers = observers
+                        break
+                    continue
+
+            # Registering takes the d2dcn callback lock, which is held while observers run, so never under ours
+            created = readerDispatch.__newEntry(reader)
+
+        return readerSubscription(self, reader, token)
+
+
+    def detach(self, reader, token):
+        with self.__mutex:
+            while True:
+                entry = self.__entries.get(id(reader))
+                if entry == None or entry.reader is not reader or token not in entry.observers:
+                    return
+
+                current = entry.observers
+                observers = dict(current)
+                del observers[token]
+                if entry.observers is current:
+                    break
+
+            entry.observers = observers
+
+            # The reader only holds our callback weakly, dropping the entry unregisters it
+            if len(observers) == 0:
+                del self.__entries[id(reader)]
+
+
+    def observerCount(self, reader=None):
+        with self.__mutex:
+            if reader != None:
+                entry = self.__entries.get(id(reader))
+                return len(entry.observers) if entry != None and entry.reader is reader else 0
+            return sum(len(entry.observers) for entry in self.__entries.values())
+
+
+    def __len__(self):
+        with self.__mutex:
+            return len(self.__entries)
+
+
+class scrollTicker(QObject):
+
+    __instances = {}
+
+    def instance(interval):
+        ticker = scrollTicker.__instances.get(interval)
+        if ticker == None:
+            ticker = scrollTicker(interval)
+            scrollTicker.__instances[interval] = ticker
+        return ticker
+
+
+    def __init__(self, interval):
+        super().__init__()
+        self.__labels = weakref.WeakSet()
+        self.__timer = QTimer(self)
+        self.__timer.setInterval(interval)
+        self.__timer.timeout.connect(self.__tick)
+        perfCounters.instance().trackTimer(self.__timer)
+
+
+    def setScrolling(self, label, scrolling):
+        # Widgets may still hide while the interpreter tears the tickers down
+        if sip.isdeleted(self.__timer):
+            return
+
+        if scrolling:
+            self.__labels.add(label)
+            if not self.__timer.isActive():
+                self.__timer.start()
+
+        elif label in self.__labels:
+            self.__labels.discard(label)
+            if len(self.__labels) == 0:
+                self.__timer.stop()
+
+
+    def __tick(self):
+        for label in list(self.__labels):
+            if not label.visibleRegion().isEmpty():
+                label.scrollTextStep()
+
+        if len(self.__labels) == 0:
+            self.__timer.stop()
+
+
+class subscriptionFilter():
+
+    MAX_CACHED_DECISIONS = 65536
+
+    def __init__(self):
+        self.__patterns = []
+        self.__state = (None, {})
+
+
+    def add(self, pattern) -> bool:
+        if pattern in self.__patterns:
+            return True
+
+        try:
+            re.compile(pattern)
+        except re.error:
+            return False
+
+        self.__patterns.append(pattern)
+        try:
+            matcher = re.compile("|".join("(?:" + item + ")" for item in self.__patterns))
+        except re.error:
+            matchers = [re.compile(item) for item in self.__patterns]
+            matcher = container()
+            matcher.search = lambda uid : next(filter(None, (item.search(uid) for item in matchers)), None)
+
+        self.__state = (matcher, {})
+        return True
+
+
+    def match(self, uid):
+        matcher, cache = self.__state
+        if matcher == None:
+            return True
+
+        accepted = cache.get(uid)
+        if accepted == None:
+            accepted = matcher.search(uid) != None
+            if len(cache) >= subscriptionFilter.MAX_CACHED_DECISIONS:
+                cache.clear()
+            cache[uid] = accepted
+
+        return accepted
+
+
+    def forget(self, uid):
+        self.__state[1].pop(uid, None)
+
+
+    @property
+    def cacheSize(self):
+        return len(self.__state[1])
+
+
+    @property
+    def patterns(self):
+        return list(self.__patterns)
+
+
+class objectResolver():
+
+    RESOLVE_WAIT = 5
+    MAX_WORKERS = 4
+
+    def __init__(self, client, max_workers=MAX_WORKERS):
+        self.__client = client
+        self.__mutex = threading.Lock()
+        self.__infos = {}
+        self.__commands = {}
+        self.__pending = set()
+        self.__pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+
+
+    def __del__(self):
+        self.__pool.shutdown(wait=False)
+
+
+    def __resolveJob(weak_ptr, uid, cache, lookup, callback):
+        objects = []
+        try:
+            objects = lookup()
+
+        finally:
+            # A failed lookup must not leave the UID pending, later resolves would never retry it
+            shared_ptr = weak_ptr()
+            resolved = shared_ptr != None and shared_ptr.__store(uid, cache, objects)
+
+        if resolved:
+            callback(objects[0])
+
+
+    def __store(self, uid, cache, objects) -> bool:
+        with self.__mutex:
+            if uid not in self.__pending:
+                return False
+
+            self.__pending.remove(uid)
+            if len(objects) == 0:
+                return False
+
+            cache[uid] = objects[0]
+            return True
+
+
+    def __resolve(self, uid, cache, lookup, callback):
+        with self.__mutex:
+            obj = cache.get(uid)
+            if obj == None:
+                if uid in self.__pending:
+                    return
+
+                self.__pending.add(uid)
+                self.__pool.submit(objectResolver.__resolveJob, weakref.ref(self), uid, cache, lookup, callback)
+                return
+
+        callback(obj)
+
+
+    def resolveInfo(self, mac, service, category, name, callback):
+        client = self.__client
+        lookup = lambda : client.getAvailableInfoReaders(name, service, category, mac, wait=objectResolver.RESOLVE_WAIT)
+        self.__resolve(d2dcn.d2d.createInfoWriterUID(mac, service, category, name), self.__infos, lookup, callback)
+
+
+    def resolveCommand(self, mac, service, category, name, callback):
+        client = self.__client
+        lookup = lambda : client.getAvailableComands(name, service, category, mac, wait=objectResolver.RESOLVE_WAIT)
+        self.__resolve(d2dcn.d2d.createCommandUID(mac, service, category, name), self.__commands, lookup, callback)
+
+
+    def cachedInfo(self, mac, service, category, name):
+        with self.__mutex:
+            return self.__infos.get(d2dcn.d2d.createInfoWriterUID(mac, service, category, name))
+
+
+    def cachedCommand(self, mac, service, category, name):
+        with self.__mutex:
+            return self.__commands.get(d2dcn.d2d.createCommandUID(mac, service, category, name))
+
+
+    def forgetInfo(self, mac, service, category, name):
+        uid = d2dcn.d2d.createInfoWriterUID(mac, service, category, name)
+        with self.__mutex:
+            self.__pending.discard(uid)
+            return self.__infos.pop(uid, None)
+
+
+    def forgetCommand(self, mac, service, category, name):
+        uid = d2dcn.d2d.createCommandUID(mac, service, category, name)
+        with self.__mutex:
+            self.__pending.discard(uid)
+            return self.__commands.pop(uid, None)
+
+
+    def cachedObjects(self):
+        with self.__mutex:
+            return list(self.__infos.values()), list(self.__commands.values())
+
+
+class historyBuffer():
+
+    ENVELOPE_BUCKETS = 80
+
+    def __init__(self, capacity):
+        self.__capacity = capacity
+        self.__timestamps = array.array('d', bytes(8 * capacity))
+        self.__values = array.array('d', bytes(8 * capacity))
+        self.__head = 0
+        self.__size = 0
+
+        # Min/max per block of samples kept on append, drawing reads the blocks instead of every sample.
+        # Blocks start at one sample and double while filling until the whole ring fits.
+        self.__block = 1
+        self.__max_block = 1
+        while -(-capacity // self.__max_block) > historyBuffer.ENVELOPE_BUCKETS:
+            self.__max_block *= 2
+        blocks = min(capacity, historyBuffer.ENVELOPE_BUCKETS)
+        self.__lows = array.array('d', bytes(8 * blocks))
+        self.__highs = array.array('d', bytes(8 * blocks))
+
+
+    def __mergeBlocks(self):
+        for block in range(0, len(self.__lows), 2):
+            pair = min(block + 2, len(self.__lows))
+            self.__lows[block // 2] = min(self.__lows[block:pair])
+            self.__highs[block // 2] = max(self.__highs[block:pair])
+        self.__block *= 2
+
+
+    def append(self, timestamp, value):
+        self.__timestamps[self.__head] = timestamp
+        self.__values[self.__head] = value
+
+        block, offset = divmod(self.__head, self.__block)
+        if block >= len(self.__lows):
+            self.__mergeBlocks()
+            block, offset = divmod(self.__head, self.__block)
+
+        # The ring overwrites a whole block before moving on, its first new sample starts it over
+        if offset == 0:
+            self.__lows[block] = value
+            self.__highs[block] = value
+        else:
+            self.__lows[block] = min(self.__lows[block], value)
+            self.__highs[block] = max(self.__highs[block], value)
+
+        self.__head = (self.__head + 1) % self.__capacity
+        if self.__size < self.__capacity:
+            self.__size += 1
+
+
+    def samples(self):
+        if self.__size < self.__capacity:
+            return self.__timestamps[:self.__size], self.__values[:self.__size]
+        return self.__timestamps[self.__head:] + self.__timestamps[:self.__head], self.__values[self.__head:] + self.__values[:self.__head]
+
+
+    def envelope(self):
+        blocks = -(-self.__size // self.__block)
+        if self.__size < self.__capacity:
+            order = range(blocks)
+
+        else:
+            # Oldest first, the samples left of a block being overwritten are no longer covered
+            block, offset = divmod(self.__head, self.__block)
+            if offset > 0:
+                block += 1
+            order = list(range(block, blocks)) + list(range(block))
+
+        return [(self.__lows[block], self.__highs[block]) for block in order]
+
+
+    def __len__(self):
+        return self.__size
+
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+
+    @property
+    def nbytes(self):
+        return (self.__timestamps.itemsize + self.__values.itemsize) * self.__capacity + (self.__lows.itemsize + self.__highs.itemsize) * len(self.__lows)
+
+
+class historyStore():
+
+    DEFAULT_CAPACITY = 1200
+    DEFAULT_BUDGET = 64 * 1024 * 1024
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, budget=DEFAULT_BUDGET):
+        self.__mutex = threading.Lock()
+        self.__buffers = collections.OrderedDict()
+        self.__used_bytes = 0
+        self.setLimits(capacity, budget)
+
+
+    def setLimits(self, capacity, budget):
+        with self.__mutex:
+            self.__capacity = capacity
+            self.__budget = budget
+            self.__buffers.clear()
+            self.__used_bytes = 0
+
+
+    def record(self, uid, timestamp, value):
+        with self.__mutex:
+            buffer = self.__buffers.get(uid)
+            if buffer == None:
+                if self.__capacity <= 0:
+                    return
+
+                buffer = historyBuffer(self.__capacity)
+                if buffer.nbytes > self.__budget:
+                    return
+
+                # Least recently updated signals are dropped first
+                while self.__used_bytes + buffer.nbytes > self.__budget:
+                    evicted_uid, evicted = self.__buffers.popitem(last=False)
+                    self.__used_bytes -= evicted.nbytes
+
+                self.__buffers[uid] = buffer
+                self.__used_bytes += buffer.nbytes
+
+            else:
+                self.__buffers.move_to_end(uid)
+
+            buffer.append(timestamp, value)
+
+
+    def samples(self, uid):
+        with self.__mutex:
+            buffer = self.__buffers.get(uid)
+            return buffer.samples() if buffer != None else None
+
+
+    def envelope(self, uid):
+        with self.__mutex:
+            buffer = self.__buffers.get(uid)
+            return buffer.envelope() if buffer != None else None
+
+
+    def remove(self, uid):
+        with self.__mutex:
+            buffer = self.__buffers.pop(uid, None)
+            if buffer != None:
+                self.__used_bytes -= buffer.nbytes
+
+
+    def __len__(self):
+        with self.__mutex:
+            return len(self.__buffers)
+
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+
+    @property
+    def usedBytes(self):
+        with self.__mutex:
+            return self.__used_bytes
+
+
+class cachedInfoReader():
+
+    def __init__(self, mac, service, category, name, valueType, value):
+        self.mac = mac
+        self.service = service
+        self.category = category
+        self.name = name
+        self.valueType = valueType
+        self.value = value
+        self.ip = ""
+        self.epoch = 0
+        self.online = False
+
+
+    def addOnUpdateCallback(self, callback):
+        pass
+
+
+class cachedCommand():
+
+    def __init__(self, mac, service, category, name, params, response):
+        self.mac = mac
+        self.service = service
+        self.category = category
+        self.name = name
+        self.params = d2dcn.commandArgsDef(params)
+        self.response = d2dcn.commandArgsDef(response)
+        self.ip = ""
+        self.enable = False
+
+
+    def call(self, args, timeout=None):
+        return d2dcn.commandResponse(d2dcn.constants.commandErrorMsg.NOT_ENABLE_ERROR)
+
+
+class topologyCache():
+
+    VERSION = 1
+
+    def save(path, infos, commands):
+        data = {}
+        data["version"] = topologyCache.VERSION
+        data["infos"] = [[info.mac, info.service, info.category, info.name, info.valueType,
+            d2dcn.typeTools.convertToASCII(info.value, info.valueType) if info.value != None else None] for info in infos]
+        data["commands"] = [[command.mac, command.service, command.category, command.name, dict(command.params), dict(command.response)] for command in commands]
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as cache_file:
+            cache_file.write(zlib.compress(json.dumps(data, separators=(",", ":")).encode()))
+        os.replace(tmp_path, path)
+
+
+    def load(path):
+        try:
+            with open(path, "rb") as cache_file:
+                data = json.loads(zlib.decompress(cache_file.read()).decode())
+
+        except (OSError, ValueError, zlib.error):
+            return [], []
+
+        if data.get("version") != topologyCache.VERSION:
+            return [], []
+
+        infos = []
+        for mac, service, category, name, valueType, value in data["infos"]:
+            value = d2dcn.typeTools.convevertFromASCII(value, valueType) if value != None else None
+            infos.append(cachedInfoReader(mac, service, category, name, valueType, value))
+
+        commands = [cachedCommand(*command) for command in data["commands"]]
+        return infos, commands
+
+
+class d2dcnWidget(QWidget):
+
+    WIDGET_VIEW = "widget"
+    TABLE_VIEW = "table"
+
+    HISTORY_TYPES = [d2dcn.constants.valueTypes.INT, d2dcn.constants.valueTypes.FLOAT]
+
+    CACHE_SAVE_PERIOD = 60
+    STALE_GRACE = 60
+
+    def __init__(self, device_hlayout=False, category_hlayout=False, object_hlayout=False, flush_rate=updateDispatcher.DEFAULT_FLUSH_RATE, view_mode=WIDGET_VIEW,
+                 lazy_services=True, release_services=False, client=None, trend=False, diagnostics=False):
+        super().__init__()
+        self.__history = historyStore(historyStore.DEFAULT_CAPACITY if trend else 0)
+        self.__history_mutex = threading.Lock()
+        self.__history_subscriptions = {}
+
+        self.__genMainLayout(device_hlayout, category_hlayout, object_hlayout, view_mode, lazy_services, release_services, trend, diagnostics)
+        self.setFlushRate(flush_rate)
+
+        self.__d2dcn_client = client if client else d2dcn.d2d(start=True)
+        self.__resolver = objectResolver(self.__d2dcn_client)
+
+        self.__d2dcn_client.onCommandAdd = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_command_update(mac, service, category, name, weak_widget)
+        self.__d2dcn_client.onCommandUpdate = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_command_update(mac, service, category, name, weak_widget)
+        self.__d2dcn_client.onCommandRemove = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_command_remove(mac, service, category, name, weak_widget)
+
+        self.__d2dcn_client.onInfoAdd = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_info_add(mac, service, category, name, weak_widget)
+        self.__d2dcn_client.onInfoUpdate = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_info_update(mac, service, category, name, weak_widget)
+        self.__d2dcn_client.onInfoRemove = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_info_remove(mac, service, category, name, weak_widget)
+
+        self.__command_filter = subscriptionFilter()
+        self.__info_filter = subscriptionFilter()
+
+        self.__cache_path = None
+        self.__cache_timer = QTimer(self)
+        self.__cache_timer.timeout.connect(self.saveTopologyCache)
+        self.__stale_mutex = threading.Lock()
+        self.__stale_infos = {}
+        self.__stale_commands = {}
+
+        self.__d2dcn_client.start()
+
+        self.__fan_out_dialog = None
+        fan_out_action = QAction("Run command on matching services...", self)
+        fan_out_action.triggered.connect(self.showFanOutDialog)
+        self.addAction(fan_out_action)
+        self.setContextMenuPolicy(Qt.ActionsContextMenu)
+
+        self.resize(500,500)
+
+
+    def __del__(self):
+        del self.__resolver
+        del self.__d2dcn_client
+
+
+    def __genMainLayout(self, device_hlayout, category_hlayout, object_hlayout, view_mode, lazy_services, release_services, trend, diagnostics):
+
+        self.__not_use_layout = QHBoxLayout()
+        self.__not_use_layout.setSpacing(0)
+        self.__not_use_layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self.__not_use_layout)
+
+        self.__scroll_widget = QWidget()
+        self.__main_layout = QHBoxLayout()
+        self.__scroll_widget.setLayout(self.__main_layout)
+
+        self.__scroll_area = QScrollArea()
+        self.__scroll_area.setWidgetResizable(True)
+        self.__scroll_area.setWidget(self.__scroll_widget)
+
+        self.__service_view = serviceView(device_hlayout, category_hlayout, object_hlayout, release_services, self.__history if trend else None)
+        self.__main_layout.addWidget(self.__service_view)
+
+        if lazy_services:
+            self.__scroll_area.horizontalScrollBar().valueChanged.connect(self.__updateViewport)
+            self.__scroll_area.verticalScrollBar().valueChanged.connect(self.__updateViewport)
+            self.__scroll_area.horizontalScrollBar().rangeChanged.connect(self.__updateViewport)
+            self.__scroll_area.verticalScrollBar().rangeChanged.connect(self.__updateViewport)
+            self.__updateViewport()
+
+        if view_mode == d2dcnWidget.TABLE_VIEW:
+            self.__info_view = infoTableView()
+            splitter = QSplitter()
+            splitter.addWidget(self.__info_view)
+            splitter.addWidget(self.__scroll_area)
+            splitter.setStretchFactor(0, 1)
+            self.__not_use_layout.addWidget(splitter)
+
+        else:
+            self.__info_view = self.__service_view
+            self.__not_use_layout.addWidget(self.__scroll_area)
+
+        if diagnostics:
+            self.__lateral_panel = lateralPanel(lambda weak_widget=weakref.ref(self) : d2dcnWidget.__counters_source(weak_widget))
+            self.__not_use_layout.addWidget(self.__lateral_panel)
+
+
+    def __counters_source(d2dcn_widget_weak):
+        d2dcn_widget = d2dcn_widget_weak()
+        return d2dcn_widget.performanceCounters() if d2dcn_widget else {}
+
+
+    def __updateViewport(self):
+        viewport = self.__scroll_area.viewport()
+        top_left = self.__service_view.mapFrom(viewport, QPoint(0, 0))
+        self.__service_view.setViewport(QRect(top_left, viewport.size()))
+
+
+    def __on_info_update(mac, service, category, name, d2dcn_widget_weak):
+        d2dcn_widget = d2dcn_widget_weak()
+        if d2dcn_widget:
+
+            # Known readers are reconfigured in place and deliver values through their own callback
+            if d2dcn_widget.__resolver.cachedInfo(mac, service, category, name) == None:
+                d2dcnWidget.__on_info_add(mac, service, category, name, d2dcn_widget_weak)
+            else:
+                perfCounters.instance().count(perfCounters.TOPOLOGY_CALLBACKS)
+
+
+    def __on_info_add(mac, service, category, name, d2dcn_widget_weak):
+        d2dcn_widget = d2dcn_widget_weak()
+        if d2dcn_widget:
+
+            counters = perfCounters.instance()
+            counters.count(perfCounters.TOPOLOGY_CALLBACKS)
+
+            uid = d2dcn.d2d.createInfoWriterUID(mac, service, category, name)
+            if not d2dcn_widget.__info_filter.match(uid):
+                counters.count(perfCounters.FILTER_REJECTED)
+            else:
+                counters.count(perfCounters.FILTER_ACCEPTED)
+                d2dcn_widget.__resolver.resolveInfo(mac, service, category, name, lambda info, weak_widget=d2dcn_widget_weak : d2dcnWidget.__post_info(info, weak_widget))
+
+
+    def __on_command_update(mac, service, category, name, d2dcn_widget_weak):
+        d2dcn_widget = d2dcn_widget_weak()
+        if d2dcn_widget:
+
+            counters = perfCounters.instance()
+            counters.count(perfCounters.TOPOLOGY_CALLBACKS)
+
+            uid = d2dcn.d2d.createCommandUID(mac, service, category, name)
+            if not d2dcn_widget.__command_filter.match(uid):
+                counters.count(perfCounters.FILTER_REJECTED)
+            else:
+                counters.count(perfCounters.FILTER_ACCEPTED)
+                d2dcn_widget.__resolver.resolveCommand(mac, service, category, name, lambda command, weak_widget=d2dcn_widget_weak : d2dcnWidget.__post_command(command, weak_widget))
+
+
+    def __post_info(info, d2dcn_widget_weak):
+        d2dcn_widget = d2dcn_widget_weak()
+        if d2dcn_widget:
+            with d2dcn_widget.__stale_mutex:
+                d2dcn_widget.__stale_infos.pop(d2dcn.d2d.createInfoWriterUID(info.mac, info.service, info.category, info.name), None)
+
+            d2dcn_widget.__attachHistory(info)
+
+            perfCounters.instance().count(perfCounters.EVENTS_POSTED)
+            QCoreApplication.postEvent(d2dcn_widget.__info_view, serviceView.addServiceInfoEvent(info))
+
+
+    def __post_command(command, d2dcn_widget_weak):
+        d2dcn_widget = d2dcn_widget_weak()
+        if d2dcn_widget:
+            with d2dcn_widget.__stale_mutex:
+                d2dcn_widget.__stale_commands.pop(d2dcn.d2d.createCommandUID(command.mac, command.service, command.category, command.name), None)
+
+            perfCounters.instance().count(perfCounters.EVENTS_POSTED)
+            QCoreApplication.postEvent(d2dcn_widget.__service_view, serviceView.addServiceCommandEvent(command))
+
+
+    def __on_info_remove(mac, service, category, name, d2dcn_widget_weak):
+        d2dcn_widget = d2dcn_widget_weak()
+        if d2dcn_widget:
+            perfCounters.instance().count(perfCounters.TOPOLOGY_CALLBACKS)
+            d2dcn_widget.__resolver.forgetInfo(mac, service, category, name)
+
+            uid = d2dcn.d2d.createInfoWriterUID(mac, service, category, name)
+            d2dcn_widget.__info_filter.forget(uid)
+            updateDispatcher.instance().forget(uid)
+            with d2dcn_widget.__history_mutex:
+                subscription = d2dcn_widget.__history_subscriptions.pop(uid, None)
+                if subscription:
+                    subscription.detach()
+            d2dcn_widget.__history.remove(uid)
+
+            perfCounters.instance().count(perfCounters.EVENTS_POSTED)
+            QCoreApplication.postEvent(d2dcn_widget.__info_view, serviceView.removeServiceInfoEvent(mac, service, category, name))
+
+
+    def __attachHistory(self, info):
+        uid = d2dcn.d2d.createInfoWriterUID(info.mac, info.service, info.category, info.name)
+        with self.__history_mutex:
+            previous = self.__history_subscriptions.pop(uid, None)
+            if previous:
+                previous.detach()
+
+            # Without history an observer would only cost a callback per publish
+            if self.__history.capacity > 0 and info.valueType in d2dcnWidget.HISTORY_TYPES:
+                self.__history_subscriptions[uid] = readerDispatch.instance().attach(info,
+                    lambda reader, uid=uid, weak_widget=weakref.ref(self) : d2dcnWidget.__record_history(uid, reader, weak_widget))
+
+
+    def __record_history(uid, info, d2dcn_widget_weak):
+        d2dcn_widget = d2dcn_widget_weak()
+        if d2dcn_widget:
+            value = info.value
+            if value != None:
+                d2dcn_widget.__history.record(uid, time.time(), value)
+
+
+    def __on_command_remove(mac, service, category, name, d2dcn_widget_weak):
+        d2dcn_widget = d2dcn_widget_weak()
+        if d2dcn_widget:
+            perfCounters.instance().count(perfCounters.TOPOLOGY_CALLBACKS)
+            d2dcn_widget.__resolver.forgetCommand(mac, service, category, name)
+            d2dcn_widget.__command_filter.forget(d2dcn.d2d.createCommandUID(mac, service, category, name))
+            perfCounters.instance().count(perfCounters.EVENTS_POSTED)
+            QCoreApplication.postEvent(d2dcn_widget.__service_view, serviceView.removeServiceCommandEvent(mac, service, category, name))
+
+
+    def setFlushRate(self, flush_rate:float):
+        updateDispatcher.instance().setFlushRate(flush_rate)
+
+
+    def setRenderBudget(self, render_budget:int):
+        updateDispatcher.instance().setRenderBudget(render_budget)
 
 
-class d2dcnWidget(QWidget):
-    def __init__(self, device_hlayout=False, category_hlayout=False, object_hlayout=False):
-        super().__init__()
-        self.__genMainLayout(device_hlayout, category_hlayout, object_hlayout)
+    def setInfoRenderPolicy(self, mac:str="", service:str="", category="", name:str="", max_rate:float=0, pinned:bool=False) -> bool:
+        return updateDispatcher.instance().setRenderPolicy(d2dcn.d2d.createInfoWriterUID(mac, service, category, name), max_rate, pinned)
 
-        self.__d2dcn_client = d2dcn.d2d(start=True)
 
-        self.__d2dcn_client.onCommandAdd = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_command_update(mac, service, category, name, weak_widget)
-        self.__d2dcn_client.onCommandUpdate = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_command_update(mac, service, category, name, weak_widget)
-        self.__d2dcn_client.onCommandRemove = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_command_remove(mac, service, category, name, weak_widget)
+    def setHistory(self, capacity:int=historyStore.DEFAULT_CAPACITY, budget:int=historyStore.DEFAULT_BUDGET):
+        self.__history.setLimits(capacity, budget)
+        with self.__history_mutex:
+            for subscription in self.__history_subscriptions.values():
+                subscription.detach()
+            self.__history_subscriptions = {}
 
-        self.__d2dcn_client.onInfoAdd = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_info_update(mac, service, category, name, weak_widget)
-        self.__d2dcn_client.onInfoUpdate = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_info_update(mac, service, category, name, weak_widget)
-        self.__d2dcn_client.onInfoRemove = lambda mac, service, category, name, weak_widget=weakref.ref(self) : d2dcnWidget.__on_info_remove(mac, service, category, name, weak_widget)
+        if capacity > 0:
+            for info in self.__resolver.cachedObjects()[0]:
+                self.__attachHistory(info)
 
-        self.__command_filters = []
-        self.__reader_filters = []
 
-        self.__d2dcn_client.start()
+    def performanceCounters(self) -> dict:
+        counters = perfCounters.instance().snapshot()
+        counters["widgets_per_service"] = self.__service_view.widgetCounts()
+        counters["filter_cache_entries"] = self.__info_filter.cacheSize + self.__command_filter.cacheSize
+        counters["render_cache_entries"] = updateDispatcher.instance().cacheSize
+        counters["reader_callbacks"] = len(readerDispatch.instance())
+        counters["reader_observers"] = readerDispatch.instance().observerCount()
+        return counters
 
-        self.resize(500,500)
 
+    def setTopologyCache(self, path:str, save_period:float=CACHE_SAVE_PERIOD, stale_grace:float=STALE_GRACE):
+        self.__cache_path = path
+        infos, commands = topologyCache.load(path)
 
-    def __del__(self):
-        del self.__d2dcn_client
+        # Cached objects are shown disabled until discovery confirms them or the grace period ends
+        with self.__stale_mutex:
+            for info in infos:
+                uid = d2dcn.d2d.createInfoWriterUID(info.mac, info.service, info.category, info.name)
+                if self.__info_filter.match(uid) and self.__resolver.cachedInfo(info.mac, info.service, info.category, info.name) == None:
+                    self.__stale_infos[uid] = info
+                    QCoreApplication.postEvent(self.__info_view, serviceView.addServiceInfoEvent(info))
 
+            for command in commands:
+                uid = d2dcn.d2d.createCommandUID(command.mac, command.service, command.category, command.name)
+                if self.__command_filter.match(uid) and self.__resolver.cachedCommand(command.mac, command.service, command.category, command.name) == None:
+                    self.__stale_commands[uid] = command
+                    QCoreApplication.postEvent(self.__service_view, serviceView.addServiceCommandEvent(command))
 
-    def __genMainLayout(self, device_hlayout, category_hlayout, object_hlayout):
+        QTimer.singleShot(int(stale_grace * 1000), self.__expireStale)
+        if save_period > 0:
+            self.__cache_timer.start(int(save_period * 1000))
 
-        self.__not_use_layout = QHBoxLayout()
-        self.__not_use_layout.setSpacing(0)
-        self.__not_use_layout.setContentsMargins(0, 0, 0, 0)
-        self.setLayout(self.__not_use_layout)
 
-        self.__scroll_widget = QWidget()
-        self.__main_layout = QHBoxLayout()
-        self.__scroll_widget.setLayout(self.__main_layout)
+    def __expireStale(self):
+        with self.__stale_mutex:
+            infos = self.__stale_infos
+            commands = self.__stale_commands
+            self.__stale_infos = {}
+            self.__stale_commands = {}
 
-        self.__scroll_area = QScrollArea()
-        self.__scroll_area.setWidgetResizable(True)
-        self.__scroll_area.setWidget(self.__scroll_widget)
-        self.__not_use_layout.addWidget(self.__scroll_area)
+        for info in infos.values():
+            QCoreApplication.postEvent(self.__info_view, serviceView.removeServiceInfoEvent(info.mac, info.service, info.category, info.name))
 
-        self.__service_view = serviceView(device_hlayout, category_hlayout, object_hlayout)
-        self.__main_layout.addWidget(self.__service_view)
+        for command in commands.values():
+            QCoreApplication.postEvent(self.__service_view, serviceView.removeServiceCommandEvent(command.mac, command.service, command.category, command.name))
 
 
-    def __on_info_update(mac, service, category, name, d2dcn_widget_weak):
-        d2dcn_widget = d2dcn_widget_weak()
-        if d2dcn_widget:
+    def saveTopologyCache(self, path:str=None):
+        path = path if path else self.__cache_path
+        if not path:
+            return
 
-            uid = d2dcn.d2d.createInfoWriterUID(mac, service, category, name)
-            ok = len(d2dcn_widget.__reader_filters) == 0
-            for item in d2dcn_widget.__reader_filters:
-                if re.search(item, uid):
-                    ok = True
-                    break
+        infos, commands = self.__resolver.cachedObjects()
+        with self.__stale_mutex:
+            infos += self.__stale_infos.values()
+            commands += self.__stale_commands.values()
+        topologyCache.save(path, infos, commands)
 
-            if ok:
-                info_reader = d2dcn_widget.__d2dcn_client.getAvailableInfoReaders(name, service, category, mac, wait=5)
-                if len(info_reader) > 0:
-                    QCoreApplication.postEvent(d2dcn_widget.__service_view, serviceView.addServiceInfoEvent(info_reader[0]))
 
+    def closeEvent(self, event):
+        self.saveTopologyCache()
+        super().closeEvent(event)
 
-    def __on_command_update(mac, service, category, name, d2dcn_widget_weak):
-        d2dcn_widget = d2dcn_widget_weak()
-        if d2dcn_widget:
 
-            uid = d2dcn.d2d.createCommandUID(mac, service, category, name)
-            ok = len(d2dcn_widget.__command_filters) == 0
-            for item in d2dcn_widget.__command_filters:
-                if re.search(item, uid):
-                    ok = True
-                    break
+    def setTrendFrameRate(self, frame_rate:float):
+        sparklineTicker.instance().setFrameRate(frame_rate)
 
-            if ok:
-                commands = d2dcn_widget.__d2dcn_client.getAvailableComands(name, service, category, mac, wait=5)
-                if len(commands) > 0:
-                    QCoreApplication.postEvent(d2dcn_widget.__service_view, serviceView.addServiceCommandEvent(commands[0]))
 
+    def getHistory(self, mac:str, service:str, category:str, name:str):
+        return self.__history.samples(d2dcn.d2d.createInfoWriterUID(mac, service, category, name))
 
-    def __on_info_remove(mac, service, category, name, d2dcn_widget_weak):
-        d2dcn_widget = d2dcn_widget_weak()
-        if d2dcn_widget:
-            QCoreApplication.postEvent(d2dcn_widget.__service_view, serviceView.removeServiceInfoEvent(mac, service, category, name))
 
+    def runCommands(self, mac:str="", service:str="", category:str="", command:str="", args:dict=None,
+                    parallelism:int=None, timeout:float=None) -> "commandFanOut":
+        # d2dcn waits forever for a match unless told not to wait
+        commands = self.__d2dcn_client.getAvailableComands(command, service, category, mac, wait=-1)
+        return commandFanOut(commands, args if args != None else {}, parallelism, timeout)
 
-    def __on_command_remove(mac, service, category, name, d2dcn_widget_weak):
-        d2dcn_widget = d2dcn_widget_weak()
-        if d2dcn_widget:
-            QCoreApplication.postEvent(d2dcn_widget.__service_view, serviceView.removeServiceCommandEvent(mac, service, category, name))
+
+    def showFanOutDialog(self):
+        if not self.__fan_out_dialog:
+            self.__fan_out_dialog = commandFanOutDialog(self.runCommands)
+        self.__fan_out_dialog.show()
+        self.__fan_out_dialog.raise_()
 
 
     def subscribeComands(self, mac:str="", service:str="", category:str="", command:str="") -> bool:
-        uid = d2dcn.d2d.createCommandUID(mac, service, category, command)
-        if uid not in self.__command_filters:
-             self.__command_filters.append(uid)
-        return True
+        return self.__command_filter.add(d2dcn.d2d.createCommandUID(mac, service, category, command))
 
 
-    def subscribeInfo(self, mac:str="", service:str="", category="", name:str="") -> bool:
-        uid = d2dcn.d2d.createInfoWriterUID(mac, service, category, name)
-        if uid not in self.__reader_filters:
-             self.__reader_filters.append(uid)
-        return True
+    def subscribeInfo(self, mac:str="", service:str="", category="", name:str="", max_rate:float=0, pinned:bool=False) -> bool:
+        if not self.__info_filter.add(d2dcn.d2d.createInfoWriterUID(mac, service, category, name)):
+            return False
+        return self.setInfoRenderPolicy(mac, service, category, name, max_rate, pinned) if max_rate > 0 or pinned else True
 
 
 class lateralPanel(QWidget):
-    def __init__(self):
+
+    REFRESH_PERIOD = 1000
+
+    COUNTERS = [
+        ("Topology callbacks/s", perfCounters.TOPOLOGY_CALLBACKS + "_per_second", "{:.1f}"),
+        ("Value callbacks/s", perfCounters.VALUE_CALLBACKS + "_per_second", "{:.1f}"),
+        ("Events posted", perfCounters.EVENTS_POSTED, "{}"),
+        ("Events processed", perfCounters.EVENTS_PROCESSED, "{}"),
+        ("Coalesced updates", perfCounters.COALESCED_UPDATES, "{}"),
+        ("Dropped updates", perfCounters.DROPPED_UPDATES, "{}"),
+        ("Deferred updates", perfCounters.DEFERRED_UPDATES, "{}"),
+        ("Unchanged updates", perfCounters.UNCHANGED_UPDATES, "{}"),
+        ("Filter rejection", "filter_rejection_ratio", "{:.1%}"),
+        ("Latency p50 (ms)", "latency_p50", "{:.1f}"),
+        ("Latency p99 (ms)", "latency_p99", "{:.1f}"),
+        ("Active timers", "active_timers", "{}"),
+        ("Reader callbacks", "reader_callbacks", "{}"),
+        ("Reader observers", "reader_observers", "{}"),
+    ]
+
+    def __init__(self, counters_source):
         super().__init__()
+        self.__counters_source = counters_source
+        self.__labels = {}
+
+        self.__main_layout = QVBoxLayout()
+        self.setLayout(self.__main_layout)
+
+        form_layout = QFormLayout()
+        self.__main_layout.addLayout(form_layout)
+        for title, key, value_format in lateralPanel.COUNTERS:
+            self.__labels[key] = QLabel()
+            form_layout.addRow(title + ":", self.__labels[key])
+
+        self.__main_layout.addWidget(QLabel("Widgets per service:"))
+        self.__widget_counts = QPlainTextEdit()
+        self.__widget_counts.setReadOnly(True)
+        self.__main_layout.addWidget(self.__widget_counts)
+
+        self.__refresh_timer = QTimer(self)
+        self.__refresh_timer.setInterval(lateralPanel.REFRESH_PERIOD)
+        self.__refresh_timer.timeout.connect(self.refresh)
+
+        self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Expanding)
+
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.__refresh_timer.start()
+
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.__refresh_timer.stop()
+
+
+    def refresh(self):
+        counters = self.__counters_source()
+        for title, key, value_format in lateralPanel.COUNTERS:
+            value = counters.get(key)
+            if value != None and key.startswith("latency"):
+                value *= 1000
+            self.__labels[key].setText(value_format.format(value) if value != None else "-")
+
+        widget_counts = counters.get("widgets_per_service", {})
+        self.__widget_counts.setPlainText("\n".join(uid + ": " + str(widget_counts[uid]) for uid in sorted(widget_counts)))
 
 
 class serviceView(QWidget):
 
+    RELEASE_DISTANCE = 3
+
     class addServiceCommandEvent(QEvent):
         def __init__(self, command):
             super().__init__(QEvent.User)
@@ -184,12 +1344,18 @@ class serviceView(QWidget):
             self.name = name
 
 
-    def __init__(self, device_hlayout, category_hlayout, object_hlayout):
+    def __init__(self, device_hlayout, category_hlayout, object_hlayout, release_hidden=False, history=None):
         super().__init__()
         self.__service_widget_map = {}
+        self.__history = history
 
         self.__object_hlayout = object_hlayout
         self.__category_hlayout = category_hlayout
+        self.__release_hidden = release_hidden
+        self.__viewport = None
+        self.__viewport_check_pending = False
+        self.__pending_events = []
+        self.__batch_slots = None
 
         if device_hlayout:
             self.__main_layout = QHBoxLayout()
@@ -203,43 +1369,120 @@ class serviceView(QWidget):
 
 
     def event(self, event):
-        if isinstance(event, serviceView.addServiceCommandEvent):
-            self.addServiceCommand(event.command)
+        if isinstance(event, (serviceView.addServiceCommandEvent, serviceView.addServiceInfoEvent,
+                              serviceView.removeServiceCommandEvent, serviceView.removeServiceInfoEvent)):
+            perfCounters.instance().count(perfCounters.EVENTS_PROCESSED)
 
-        elif isinstance(event, serviceView.addServiceInfoEvent):
-            self.addServiceInfo(event.info)
+            # Topology events posted back to back are applied together once the burst has been delivered
+            if len(self.__pending_events) == 0:
+                QTimer.singleShot(0, self.__applyPendingEvents)
+            self.__pending_events.append(event)
+            return True
 
-        elif isinstance(event, serviceView.removeServiceCommandEvent):
-            self.removeServiceCommand(event.mac, event.service, event.category, event.name)
+        return super().event(event)
 
-        elif isinstance(event, serviceView.removeServiceInfoEvent):
-            self.removeServiceInfo(event.mac, event.service, event.category, event.name)
 
-        else:
-            return super().event(event)
+    def __applyPendingEvents(self):
+        events = self.__pending_events
+        self.__pending_events = []
+        if len(events) == 0:
+            return
 
-        return True
+        self.setUpdatesEnabled(False)
+        self.__batch_slots = {}
+
+        for event in events:
+            if isinstance(event, serviceView.addServiceCommandEvent):
+                self.addServiceCommand(event.command)
+
+            elif isinstance(event, serviceView.addServiceInfoEvent):
+                self.addServiceInfo(event.info)
+
+            elif isinstance(event, serviceView.removeServiceCommandEvent):
+                self.removeServiceCommand(event.mac, event.service, event.category, event.name)
+
+            elif isinstance(event, serviceView.removeServiceInfoEvent):
+                self.removeServiceInfo(event.mac, event.service, event.category, event.name)
+
+        batch_slots = self.__batch_slots
+        self.__batch_slots = None
+        for uid, slot in batch_slots.items():
+            if self.__service_widget_map.get(uid) is slot:
+                slot.endBatch()
+
+        self.setUpdatesEnabled(True)
+
+
+    def __slot(self, uid):
+        slot = self.__service_widget_map[uid]
+        if self.__batch_slots != None and uid not in self.__batch_slots:
+            self.__batch_slots[uid] = slot
+            slot.beginBatch()
+        return slot
 
 
     def generateServiceUID(self, device_mac, service_name):
         return device_mac + "/" + service_name
 
 
+    def setViewport(self, rect):
+        self.__viewport = rect
+        self.__scheduleViewportCheck()
+
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.__scheduleViewportCheck()
+
+
+    def __scheduleViewportCheck(self):
+        if self.__viewport == None or self.__viewport_check_pending:
+            return
+
+        self.__viewport_check_pending = True
+        QTimer.singleShot(0, self.__checkViewport)
+
+
+    def __checkViewport(self):
+        self.__viewport_check_pending = False
+
+        margin = max(self.__viewport.width(), self.__viewport.height())
+        near_rect = self.__viewport.adjusted(-margin, -margin, margin, margin)
+        far_margin = margin * serviceView.RELEASE_DISTANCE
+        far_rect = self.__viewport.adjusted(-far_margin, -far_margin, far_margin, far_margin)
+
+        for slot in self.__service_widget_map.values():
+            if near_rect.intersects(slot.geometry()):
+                slot.materialize()
+
+            elif self.__release_hidden and not far_rect.intersects(slot.geometry()):
+                slot.release()
+
+
+    def widgetCounts(self) -> dict:
+        return {uid: slot.widgetCount() for uid, slot in self.__service_widget_map.items()}
+
+
     def addService(self, device_mac, service_name, ip):
         self.removeService(device_mac, service_name)
-        widget = service(device_mac, service_name, self.__category_hlayout, self.__object_hlayout)
+        widget = serviceSlot(device_mac, service_name, self.__category_hlayout, self.__object_hlayout, self.__history)
+        widget.geometryChanged.connect(self.__scheduleViewportCheck)
         self.__service_widget_map[self.generateServiceUID(device_mac, service_name)] = widget
         self.__main_layout.addWidget(widget)
         widget.setToolTip(ip)
 
+        if self.__viewport == None:
+            widget.materialize()
+
 
     def removeService(self, device_mac, service_name):
         uid = self.generateServiceUID(device_mac, service_name)
         if not uid in self.__service_widget_map:
             return
 
-        self.__main_layout.removeWidget(self.__service_widget_map[uid])
-        self.__service_widget_map.remove(uid)
+        widget = self.__service_widget_map.pop(uid)
+        self.__main_layout.removeWidget(widget)
+        widget.deleteLater()
 
 
     def addServiceInfo(self, info_obj):
@@ -247,7 +1490,7 @@ class serviceView(QWidget):
         if uid not in self.__service_widget_map:
             self.addService(info_obj.mac, info_obj.service, info_obj.ip)
 
-        widget = self.__service_widget_map[uid]
+        widget = self.__slot(uid)
         widget.addInfo(info_obj)
 
 
@@ -259,10 +1502,8 @@ class serviceView(QWidget):
         widget = self.__service_widget_map[uid]
         widget.removeInfo(name)
 
-
         if widget.objectCount() == 0:
-            del self.__service_widget_map[uid]
-            widget.deleteLater()
+            self.removeService(mac, service)
 
 
     def addServiceCommand(self, command_obj):
@@ -270,31 +1511,425 @@ class serviceView(QWidget):
         if uid not in self.__service_widget_map:
             self.addService(command_obj.mac, command_obj.service, command_obj.ip)
 
-        widget = self.__service_widget_map[uid]
+        widget = self.__slot(uid)
         widget.addCommand(command_obj)
 
 
-    def removeServiceCommand(self, mac, service, category, name):
-        uid = self.generateServiceUID(mac, service)
-        if uid not in self.__service_widget_map:
-            return
+    def removeServiceCommand(self, mac, service, category, name):
+        uid = self.generateServiceUID(mac, service)
+        if uid not in self.__service_widget_map:
+            return
+
+        widget = self.__service_widget_map[uid]
+        widget.removeCommand(name)
+
+        if widget.objectCount() == 0:
+            self.removeService(mac, service)
+
+
+class serviceSlot(QWidget):
+
+    PLACEHOLDER_HEADER = 40
+    PLACEHOLDER_ROW = 36
+
+    geometryChanged = pyqtSignal()
+
+    def __init__(self, device_mac, service_name, category_hlayout, object_hlayout, history=None):
+        super().__init__()
+        self.__device_mac = device_mac
+        self.__service_name = service_name
+        self.__category_hlayout = category_hlayout
+        self.__object_hlayout = object_hlayout
+        self.__history = history
+        self.__info_map = {}
+        self.__command_map = {}
+        self.__service_widget = None
+        self.__released_size = None
+        self.__collapsed = False
+        self.__batching = False
+
+        self.__main_layout = QVBoxLayout()
+        self.__main_layout.setSpacing(0)
+        self.__main_layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self.__main_layout)
+
+        self.__placeholder = QLabel(service_name + " (" + device_mac + ")")
+        self.__placeholder.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        self.__placeholder.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.__main_layout.addWidget(self.__placeholder)
+        self.__updatePlaceholder()
+
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+
+
+    def __updatePlaceholder(self):
+        if self.__service_widget:
+            return
+
+        if self.__released_size:
+            self.__placeholder.setFixedHeight(self.__released_size.height())
+
+        elif self.__object_hlayout:
+            self.__placeholder.setFixedHeight(serviceSlot.PLACEHOLDER_HEADER + serviceSlot.PLACEHOLDER_ROW)
+
+        else:
+            rows = max(len(self.__info_map), len(self.__command_map))
+            self.__placeholder.setFixedHeight(serviceSlot.PLACEHOLDER_HEADER + serviceSlot.PLACEHOLDER_ROW * rows)
+
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.geometryChanged.emit()
+
+
+    def moveEvent(self, event):
+        super().moveEvent(event)
+        self.geometryChanged.emit()
+
+
+    def isMaterialized(self):
+        return self.__service_widget != None
+
+
+    def beginBatch(self):
+        if self.__batching:
+            return
+
+        self.__batching = True
+        if self.__service_widget:
+            self.__service_widget.beginBatch()
+
+
+    def endBatch(self):
+        if not self.__batching:
+            return
+
+        self.__batching = False
+        if self.__service_widget:
+            self.__service_widget.endBatch()
+
+
+    def materialize(self):
+        if self.__service_widget:
+            return
+
+        widget = service(self.__device_mac, self.__service_name, self.__category_hlayout, self.__object_hlayout, self.__history)
+        widget.beginBatch()
+        for info_obj in self.__info_map.values():
+            widget.addInfo(info_obj)
+        for command_obj in self.__command_map.values():
+            widget.addCommand(command_obj)
+        widget.setCollapsed(self.__collapsed)
+        if not self.__batching:
+            widget.endBatch()
+
+        self.__service_widget = widget
+        self.__placeholder.hide()
+        self.__main_layout.addWidget(widget)
+
+
+    def release(self):
+        if not self.__service_widget:
+            return
+
+        self.__released_size = self.__service_widget.size()
+        self.__collapsed = self.__service_widget.isCollapsed()
+        self.__service_widget.suspendUpdates()
+        self.__main_layout.removeWidget(self.__service_widget)
+        self.__service_widget.deleteLater()
+        self.__service_widget = None
+
+        self.__updatePlaceholder()
+        self.__placeholder.show()
+
+
+    def addInfo(self, info_obj):
+        if isinstance(info_obj, cachedInfoReader) and info_obj.name in self.__info_map:
+            return
+
+        self.__info_map[info_obj.name] = info_obj
+        if self.__service_widget:
+            self.__service_widget.addInfo(info_obj)
+        else:
+            self.__updatePlaceholder()
+
+
+    def removeInfo(self, name):
+        self.__info_map.pop(name, None)
+        if self.__service_widget:
+            self.__service_widget.removeInfo(name)
+        else:
+            self.__updatePlaceholder()
+
+
+    def addCommand(self, command_obj):
+        if isinstance(command_obj, cachedCommand) and command_obj.name in self.__command_map:
+            return
+
+        self.__command_map[command_obj.name] = command_obj
+        if self.__service_widget:
+            self.__service_widget.addCommand(command_obj)
+        else:
+            self.__updatePlaceholder()
+
+
+    def removeCommand(self, name):
+        self.__command_map.pop(name, None)
+        if self.__service_widget:
+            self.__service_widget.removeCommand(name)
+        else:
+            self.__updatePlaceholder()
+
+
+    def objectCount(self):
+        return len(self.__info_map) + len(self.__command_map)
+
+
+    def widgetCount(self):
+        return self.__service_widget.objectCount() if self.__service_widget else 0
+
+
+class infoTableModel(QAbstractTableModel):
+
+    COLUMNS = ["Mac", "Service", "Category", "Name", "Type", "Value", "Timestamp"]
+    MAC_COLUMN = 0
+    SERVICE_COLUMN = 1
+    CATEGORY_COLUMN = 2
+    NAME_COLUMN = 3
+    TYPE_COLUMN = 4
+    VALUE_COLUMN = 5
+    TIMESTAMP_COLUMN = 6
+
+    def __init__(self):
+        super().__init__()
+        self.__row_map = {}
+        self.__uids = []
+        self.__macs = []
+        self.__services = []
+        self.__categories = []
+        self.__names = []
+        self.__types = []
+        self.__values = []
+        self.__timestamps = array.array("d")
+        self.__readers = {}
+        self.__subscriptions = {}
+        self.__changed_rows = None
+        self.__removed_uids = set()
+
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.__uids)
+
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(infoTableModel.COLUMNS)
+
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return infoTableModel.COLUMNS[section]
+        return None
+
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+
+        row = index.row()
+        column = index.column()
+        if column == infoTableModel.MAC_COLUMN:
+            return self.__macs[row]
+
+        elif column == infoTableModel.SERVICE_COLUMN:
+            return self.__services[row]
+
+        elif column == infoTableModel.CATEGORY_COLUMN:
+            return self.__categories[row]
+
+        elif column == infoTableModel.NAME_COLUMN:
+            return self.__names[row]
+
+        elif column == infoTableModel.TYPE_COLUMN:
+            return self.__types[row]
+
+        elif column == infoTableModel.VALUE_COLUMN:
+            return fieldOutput.formatValue(self.__types[row], self.__values[row])
+
+        elif column == infoTableModel.TIMESTAMP_COLUMN:
+            timestamp = self.__timestamps[row]
+            return time.strftime("%H:%M:%S", time.localtime(timestamp)) if timestamp > 0 else ""
+
+        return None
+
+
+    def __update_callback(weak_ptr, uid, reader_info):
+        shared_ptr = weak_ptr()
+        if shared_ptr:
+            updateDispatcher.instance().push(uid, shared_ptr, reader_info.value)
+
+
+    def addInfo(self, info_obj):
+        uid = d2dcn.d2d.createInfoWriterUID(info_obj.mac, info_obj.service, info_obj.category, info_obj.name)
+        if self.__readers.get(uid) is info_obj or (isinstance(info_obj, cachedInfoReader) and uid in self.__readers):
+            return
+
+        # Added back before the pending removal ran, the row is still there
+        self.__removed_uids.discard(uid)
+        if uid not in self.__row_map:
+            row = len(self.__uids)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.__row_map[uid] = row
+            self.__uids.append(uid)
+            self.__macs.append(sys.intern(info_obj.mac))
+            self.__services.append(sys.intern(info_obj.service))
+            self.__categories.append(sys.intern(info_obj.category))
+            self.__names.append(info_obj.name)
+            self.__types.append(sys.intern(info_obj.valueType))
+            self.__values.append(info_obj.value)
+            self.__timestamps.append(time.time() if info_obj.value != None else 0)
+            self.endInsertRows()
+
+        self.__readers[uid] = info_obj
+        previous = self.__subscriptions.pop(uid, None)
+        if previous:
+            previous.detach()
+        if not isinstance(info_obj, cachedInfoReader):
+            self.__subscriptions[uid] = readerDispatch.instance().attach(info_obj,
+                lambda reader_info, weak_ptr=weakref.ref(self), uid=uid : infoTableModel.__update_callback(weak_ptr, uid, reader_info))
+        self.dispatchUpdate(uid, info_obj.value)
+
+
+    def removeInfo(self, mac, service, category, name):
+        uid = d2dcn.d2d.createInfoWriterUID(mac, service, category, name)
+        if uid not in self.__row_map or uid in self.__removed_uids:
+            return
+
+        self.__readers.pop(uid)
+        subscription = self.__subscriptions.pop(uid, None)
+        if subscription:
+            subscription.detach()
+
+        # Devices leave many infos at once, drop them together so the rows below shift only once
+        if len(self.__removed_uids) == 0:
+            QTimer.singleShot(0, self.__emitRemovals)
+        self.__removed_uids.add(uid)
+
+
+    def __emitRemovals(self):
+        if len(self.__removed_uids) == 0:
+            return
+
+        rows = sorted((self.__row_map.pop(uid) for uid in self.__removed_uids), reverse=True)
+        self.__removed_uids = set()
+
+        # Real removals keep the proxy filter and sort valid, bottom runs first so the rows above keep their index
+        columns = [self.__uids, self.__macs, self.__services, self.__categories, self.__names, self.__types, self.__values, self.__timestamps]
+        index = 0
+        while index < len(rows):
+            last = rows[index]
+            first = last
+            index += 1
+            while index < len(rows) and rows[index] == first - 1:
+                first -= 1
+                index += 1
+
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for column in columns:
+                del column[first:last + 1]
+            self.endRemoveRows()
+
+        first = rows[-1]
+        self.__row_map.update(zip(self.__uids[first:], range(first, len(self.__uids))))
+
+
+    def dispatchUpdate(self, uid, value):
+        row = self.__row_map.get(uid)
+        if row == None:
+            return
+
+        self.__values[row] = value
+        self.__timestamps[row] = time.time()
+
+        if self.__changed_rows == None:
+            self.__changed_rows = [row, row]
+            QTimer.singleShot(0, self.__emitChanges)
+
+        else:
+            self.__changed_rows[0] = min(self.__changed_rows[0], row)
+            self.__changed_rows[1] = max(self.__changed_rows[1], row)
+
+
+    def __emitChanges(self):
+        if self.__changed_rows == None:
+            return
+
+        first, last = self.__changed_rows
+        self.__changed_rows = None
+        last = min(last, len(self.__uids) - 1)
+        if first <= last:
+            self.dataChanged.emit(self.index(first, infoTableModel.VALUE_COLUMN), self.index(last, infoTableModel.TIMESTAMP_COLUMN), [Qt.DisplayRole])
+
+
+class infoTableView(QWidget):
+
+    def __init__(self):
+        super().__init__()
+
+        self.__main_layout = QVBoxLayout()
+        self.__main_layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self.__main_layout)
+
+        self.__model = infoTableModel()
+        self.__proxy_model = QSortFilterProxyModel()
+        self.__proxy_model.setSourceModel(self.__model)
+        self.__proxy_model.setFilterKeyColumn(-1)
+        self.__proxy_model.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self.__proxy_model.setDynamicSortFilter(False)
+
+        self.__filter_edit = QLineEdit()
+        self.__filter_edit.setPlaceholderText("Filter")
+        self.__filter_edit.textChanged.connect(self.__proxy_model.setFilterFixedString)
+        self.__main_layout.addWidget(self.__filter_edit)
+
+        self.__table = QTableView()
+        self.__table.setModel(self.__proxy_model)
+        self.__table.setSortingEnabled(True)
+        self.__table.setAlternatingRowColors(True)
+        self.__table.setSelectionBehavior(QTableView.SelectRows)
+        self.__table.verticalHeader().hide()
+        self.__table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.__table.horizontalHeader().setStretchLastSection(True)
+        self.__main_layout.addWidget(self.__table)
+
+
+    def event(self, event):
+        if isinstance(event, serviceView.addServiceInfoEvent):
+            perfCounters.instance().count(perfCounters.EVENTS_PROCESSED)
+            self.__model.addInfo(event.info)
+
+        elif isinstance(event, serviceView.removeServiceInfoEvent):
+            perfCounters.instance().count(perfCounters.EVENTS_PROCESSED)
+            self.__model.removeInfo(event.mac, event.service, event.category, event.name)
+
+        else:
+            return super().event(event)
+
+        return True
 
-        widget = self.__service_widget_map[uid]
-        widget.removeCommand(name)
 
-        if widget.objectCount() == 0:
-            del self.__service_widget_map[uid]
-            widget.deleteLater()
+    def model(self):
+        return self.__model
 
 
 class service(QTabWidget):
 
-    def __init__(self, device_mac, service_name, category_hlayout, object_hlayout):
+    def __init__(self, device_mac, service_name, category_hlayout, object_hlayout, history=None):
         super().__init__()
         self.__device_mac = device_mac
         self.__service_name = service_name
         self.__object_hlayout = object_hlayout
         self.__category_hlayout = category_hlayout
+        self.__history = history
         widget_main = QWidget()
         self.__title = service_name + " (" + device_mac + ")"
         self.__main_widget = widget_main
@@ -305,6 +1940,10 @@ class service(QTabWidget):
         self.__info_widget_category_map = {}
         self.__command_widget_map = {}
         self.__command_widget_category_map = {}
+        self.__info_categories = {}
+        self.__command_categories = {}
+        self.__batching = False
+        self.__pending_categories = []
 
         self.__main_layout = QHBoxLayout()
         widget_main.setLayout(self.__main_layout)
@@ -344,12 +1983,92 @@ class service(QTabWidget):
         self.tabBarDoubleClicked.connect(self.__showHideTab)
 
     def __showHideTab(self):
-        if self.widget(0) == self.__main_widget:
-            self.removeTab(0)
+        self.setCollapsed(not self.isCollapsed())
+
+
+    def beginBatch(self):
+        self.__batching = True
+
+
+    def endBatch(self):
+        self.__batching = False
+        for layout, category_container in self.__pending_categories:
+            self.__attachCategory(layout, category_container)
+        self.__pending_categories = []
+
+
+    def __attachCategory(self, layout, category_container):
+
+        # New categories are filled while detached during a batch and attached in one go
+        if self.__batching:
+            self.__pending_categories.append((layout, category_container))
+            return
+
+        if layout.count() > 0:
+            if self.__object_hlayout:
+                layout.addWidget(QVLine())
+            else:
+                layout.addWidget(QHLine())
+
+        layout.addWidget(category_container)
+
+
+    def __removeFromCategory(self, layout, category_map, category, widget):
+        category_container_layout = category_map[category]
+        category_container_layout.removeWidget(widget)
+        widget.deleteLater()
+        if category_container_layout.count() > 0:
+            return
+
+        del category_map[category]
+        category_container = category_container_layout.parentWidget()
+
+        for pending in self.__pending_categories:
+            if pending[1] is category_container:
+                self.__pending_categories.remove(pending)
+                category_container.deleteLater()
+                return
+
+        # Drop the separator in front of the container, or the one after it when it was the first
+        index = layout.indexOf(category_container)
+        separator_index = index - 1 if index > 0 else index + 1
+        separator = layout.itemAt(separator_index).widget() if separator_index < layout.count() else None
+
+        layout.removeWidget(category_container)
+        category_container.deleteLater()
+        if separator:
+            layout.removeWidget(separator)
+            separator.deleteLater()
+
+
+    def __updateSections(self):
+        self.__info_widget.setVisible(len(self.__info_widget_map) > 0)
+        self.__command_widget.setVisible(len(self.__command_widget_map) > 0)
+        self.__dif_line.setVisible(len(self.__info_widget_map) > 0 and len(self.__command_widget_map) > 0)
+
+
+    def isCollapsed(self):
+        return self.widget(0) != self.__main_widget
+
+
+    def setCollapsed(self, collapsed):
+        if collapsed == self.isCollapsed():
+            return
+
+        self.removeTab(0)
+        if collapsed:
             self.addTab(self.__hidden_widget, self.__title)
+            self.suspendUpdates()
+
         else:
-            self.removeTab(0)
             self.addTab(self.__main_widget, self.__title)
+            for widget in self.__info_widget_map.values():
+                widget.resume()
+
+
+    def suspendUpdates(self):
+        for widget in self.__info_widget_map.values():
+            widget.suspend()
 
 
     def addInfo(self, info_obj):
@@ -368,36 +2087,38 @@ class service(QTabWidget):
                 category_container.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
                 category_container.setLayout(category_container_layout)
                 self.__info_widget_category_map[info_obj.category] = category_container_layout
-
-                if len(self.__info_widget_category_map) >= 2:
-                    if self.__object_hlayout:
-                        self.__info_layout.addWidget(QVLine())
-                    else:
-                        self.__info_layout.addWidget(QHLine())
-
-                self.__info_layout.addWidget(category_container)
+                self.__attachCategory(self.__info_layout, category_container)
 
             else:
                 category_container_layout = self.__info_widget_category_map[info_obj.category]
 
-            widget = fieldOutput(info_obj.name, info_obj.valueType, info_obj.value)
+            widget = fieldOutput(info_obj.name, info_obj.valueType, info_obj.value, history=self.__history)
             widget.setInfoReader(info_obj)
+            if self.isCollapsed():
+                widget.suspend()
             self.__info_widget_map[info_obj.name] = widget
+            self.__info_categories[info_obj.name] = info_obj.category
             category_container_layout.addWidget(widget)
 
-        else:
-            self.__info_widget_map[info_obj.name].update(info_obj.value)
+            self.__info_widget.show()
+            if len(self.__command_widget_map) > 0:
+                self.__dif_line.show()
 
-        self.__info_widget.show()
-        if len(self.__info_widget_map) > 0 and len(self.__command_widget_map) > 0:
-            self.__dif_line.show()
+        else:
+            widget = self.__info_widget_map[info_obj.name]
+            if widget.getInfoReader() is not info_obj:
+                widget.setInfoReader(info_obj)
+                widget.update(info_obj.value)
+                if self.isCollapsed():
+                    widget.suspend()
 
 
     def removeInfo(self, name):
         if name in self.__info_widget_map:
             widget = self.__info_widget_map.pop(name)
             widget.setInfoReader(None)
-            widget.deleteLater()
+            self.__removeFromCategory(self.__info_layout, self.__info_widget_category_map, self.__info_categories.pop(name), widget)
+            self.__updateSections()
 
 
     def addCommand(self, command_obj):
@@ -416,14 +2137,7 @@ class service(QTabWidget):
                 category_container.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
                 category_container.setLayout(category_container_layout)
                 self.__command_widget_category_map[command_obj.category] = category_container_layout
-
-                if len(self.__command_widget_category_map) >= 2:
-                    if self.__object_hlayout:
-                        self.__command_layout.addWidget(QVLine())
-                    else:
-                        self.__command_layout.addWidget(QHLine())
-
-                self.__command_layout.addWidget(category_container)
+                self.__attachCategory(self.__command_layout, category_container)
 
             else:
                 category_container_layout = self.__command_widget_category_map[command_obj.category]
@@ -431,6 +2145,7 @@ class service(QTabWidget):
 
             widget = serviceCommand(command_obj)
             self.__command_widget_map[command_obj.name] = widget
+            self.__command_categories[command_obj.name] = command_obj.category
             category_container_layout.addWidget(widget)
 
         else:
@@ -443,7 +2158,9 @@ class service(QTabWidget):
 
     def removeCommand(self, name):
         if name in self.__command_widget_map:
-            self.__command_widget_map.pop(name).deleteLater()
+            widget = self.__command_widget_map.pop(name)
+            self.__removeFromCategory(self.__command_layout, self.__command_widget_category_map, self.__command_categories.pop(name), widget)
+            self.__updateSections()
 
 
     def objectCount(self):
@@ -452,12 +2169,11 @@ class service(QTabWidget):
 
 class fieldOutput(QWidget):
 
-    class updateValueEvent(QEvent):
-        def __init__(self, value):
-            super().__init__(QEvent.User)
-            self.value = value
+    ARRAY_PREVIEW_ITEMS = 32
+    CHAR_WIDTH = 8
+    MAX_MIN_WIDTH = 100
 
-    def __init__(self, name, valueType, value, scroll_time=250):
+    def __init__(self, name, valueType, value, scroll_time=250, history=None):
         super().__init__()
 
         self.__main_layout = QHBoxLayout()
@@ -467,6 +2183,18 @@ class fieldOutput(QWidget):
         self.__value_label.setAlignment(Qt.AlignVCenter | Qt.AlignLeft)
         self.__valueType = valueType
         self.__reader_info = None
+        self.__reader_uid = None
+        self.__subscription = None
+        self.__name = name
+        self.__value = None
+        self.__last_list = None
+        self.__rendered = False
+        self.__detail_widget = None
+        self.__min_width = 0
+        self.__value_label.installEventFilter(self)
+        self.__font_metric = QFontMetrics(self.__value_label.font())
+        self.__glyph_prefix = None
+        self.__scroll_ticker = scrollTicker.instance(scroll_time) if scroll_time > 0 else None
 
         self.setLayout(self.__main_layout)
         tag_label = QLabel(name + ": ")
@@ -474,12 +2202,14 @@ class fieldOutput(QWidget):
         tag_label.setAlignment(Qt.AlignVCenter | Qt.AlignRight)
         self.__main_layout.addWidget(tag_label)
         self.__main_layout.addWidget(self.__value_label)
-        self.update(value)
 
-        if scroll_time > 0:
-            self.__update_timer = QTimer()
-            self.__update_timer.timeout.connect(self.scrollTextStep)
-            self.__update_timer.start(scroll_time)
+        if history != None and valueType in d2dcnWidget.HISTORY_TYPES:
+            self.__trend = sparkline(history)
+            self.__main_layout.addWidget(self.__trend)
+        else:
+            self.__trend = None
+
+        self.update(value)
 
 
     def scrollTextStep(self):
@@ -491,14 +2221,11 @@ class fieldOutput(QWidget):
             cursor_pos = 0
 
         elif cursor_pos == 0:
-            font_metric = QFontMetrics(self.__value_label.font())
-            pix_pos = 0
-            for c in self.__value_label.text():
-                char_pix = font_metric.horizontalAdvance(c)
-                pix_pos += char_pix
-                cursor_pos += 1
-                if pix_pos >= self.__value_label.width() - (5 * char_pix):
-                    break
+            if self.__glyph_prefix == None:
+                self.__glyph_prefix = list(itertools.accumulate(self.__font_metric.horizontalAdvance(c) for c in self.__value_label.text()))
+
+            stop_pix = self.__value_label.width() - (5 * self.__font_metric.averageCharWidth())
+            cursor_pos = min(bisect.bisect_left(self.__glyph_prefix, stop_pix) + 1, len(self.__glyph_prefix))
 
         else:
             cursor_pos += 1
@@ -506,81 +2233,277 @@ class fieldOutput(QWidget):
         self.__value_label.setCursorPosition(cursor_pos)
 
 
+    def __updateScrolling(self):
+        if self.__scroll_ticker:
+            overflow = self.__font_metric.horizontalAdvance(self.__value_label.text()) > self.__value_label.width()
+            self.__scroll_ticker.setScrolling(self, overflow and self.isVisible())
+
+
     def resizeEvent(self, event):
         self.__value_label.setCursorPosition(0)
         super().resizeEvent(event)
+        self.__updateScrolling()
 
 
-    def update(self, value):
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.__updateScrolling()
+
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.__updateScrolling()
+
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange:
+            self.__font_metric = QFontMetrics(self.__value_label.font())
+            self.__glyph_prefix = None
+
+
+    def __formatArray(value, item_format, separator, summary, preview_items):
+        if preview_items == None or len(value) <= preview_items:
+            return separator.join(map(item_format, value))
+
+        preview = separator.join(map(item_format, itertools.islice(value, preview_items)))
+        return "[" + summary(value) + "] " + preview + separator + "..."
+
+
+    def __numericSummary(value):
+        mean = format(sum(value) / len(value), ".6g")
+        return str(len(value)) + " items, min " + str(min(value)) + ", max " + str(max(value)) + ", mean " + mean
+
+
+    def __boolSummary(value):
+        return str(len(value)) + " items, " + str(sum(value)) + " set"
+
+
+    def __itemsSummary(value):
+        return str(len(value)) + " items"
+
+
+    def formatValue(valueType, value, preview_items=ARRAY_PREVIEW_ITEMS):
 
         if value == None:
-            self.__value_label.setText("")
+            return ""
 
-        elif self.__valueType == d2dcn.constants.valueTypes.BOOL:
-            self.__value_label.setText(str(value))
+        elif valueType == d2dcn.constants.valueTypes.BOOL:
+            return str(value)
 
-        elif self.__valueType == d2dcn.constants.valueTypes.FLOAT:
-            self.__value_label.setText(str(value))
+        elif valueType == d2dcn.constants.valueTypes.FLOAT:
+            return str(value)
 
-        elif self.__valueType == d2dcn.constants.valueTypes.INT:
-            self.__value_label.setText(str(value))
+        elif valueType == d2dcn.constants.valueTypes.INT:
+            return str(value)
 
-        elif self.__valueType == d2dcn.constants.valueTypes.STRING:
-            self.__value_label.setText(value)
+        elif valueType == d2dcn.constants.valueTypes.STRING:
+            return value
 
-        elif self.__valueType == d2dcn.constants.valueTypes.BOOL_ARRAY:
-            value_txt = []
-            for item in value:
-                value_txt.append(str("1" if item else "0"))
-            self.__value_label.setText(fieldInput.INPUT_NUM_SEPATAROR.join(value_txt))
+        elif valueType == d2dcn.constants.valueTypes.BOOL_ARRAY:
+            return fieldOutput.__formatArray(value, lambda item : "1" if item else "0", fieldInput.INPUT_NUM_SEPATAROR, fieldOutput.__boolSummary, preview_items)
 
-        elif self.__valueType == d2dcn.constants.valueTypes.INT_ARRAY:
-            value_txt = []
-            for item in value:
-                value_txt.append(str(item))
-            self.__value_label.setText(fieldInput.INPUT_NUM_SEPATAROR.join(value_txt))
+        elif valueType == d2dcn.constants.valueTypes.INT_ARRAY:
+            return fieldOutput.__formatArray(value, str, fieldInput.INPUT_NUM_SEPATAROR, fieldOutput.__numericSummary, preview_items)
 
-        elif self.__valueType == d2dcn.constants.valueTypes.STRING_ARRAY:
-            self.__value_label.setText(fieldInput.INPUT_STR_SEPATAROR.join(value))
+        elif valueType == d2dcn.constants.valueTypes.STRING_ARRAY:
+            return fieldOutput.__formatArray(value, str, fieldInput.INPUT_STR_SEPATAROR, fieldOutput.__itemsSummary, preview_items)
 
-        elif self.__valueType == d2dcn.constants.valueTypes.FLOAT_ARRAY:
-            value_txt = []
-            for item in value:
-                value_txt.append(str(item))
-            self.__value_label.setText(fieldInput.INPUT_NUM_SEPATAROR.join(value_txt))
+        elif valueType == d2dcn.constants.valueTypes.FLOAT_ARRAY:
+            return fieldOutput.__formatArray(value, str, fieldInput.INPUT_NUM_SEPATAROR, fieldOutput.__numericSummary, preview_items)
 
         else:
-            self.__value_label.setText("unknown type")
+            return "unknown type"
 
-        text_lenght = len(self.__value_label.text()) * 8
-        if text_lenght < 100:
-            self.__value_label.setMinimumWidth(text_lenght)
 
-        else:
-            self.__value_label.setMinimumWidth(100)
+    def eventFilter(self, obj, event):
+        if obj == self.__value_label and event.type() == QEvent.MouseButtonDblClick:
+            if isinstance(self.__value, list) and len(self.__value) > fieldOutput.ARRAY_PREVIEW_ITEMS:
+                self.showDetail()
+                return True
 
+        return super().eventFilter(obj, event)
 
-    def event(self, event):
-        if isinstance(event, fieldOutput.updateValueEvent):
-            self.update(event.value)
 
+    def showDetail(self):
+        self.__detail_widget = arrayDetail(self.__name, self.__valueType, self.__value)
+        self.__detail_widget.show()
+
+
+    def update(self, value):
+
+        if self.__trend:
+            self.__trend.markDirty()
+
+        # Devices republish unchanged values, skip formatting and repaint when the text can not change
+        if isinstance(value, list):
+            # Compared against a copy of what was rendered, devices may modify their lists in place
+            unchanged = value == self.__last_list
         else:
-            return super().event(event)
+            unchanged = type(value) is type(self.__value) and value == self.__value
 
-        return True
+        self.__value = value
+        if unchanged and self.__rendered:
+            perfCounters.instance().count(perfCounters.UNCHANGED_UPDATES)
+            return
+
+        self.__last_list = list(value) if isinstance(value, list) else None
+        self.__rendered = True
+        self.__value_label.setText(fieldOutput.formatValue(self.__valueType, value))
 
+        self.__glyph_prefix = None
+        self.__updateScrolling()
 
-    def __update_callback(weak_ptr):
+        # Only grow, every minimum width change invalidates the layouts above
+        text_lenght = min(len(self.__value_label.text()) * fieldOutput.CHAR_WIDTH, fieldOutput.MAX_MIN_WIDTH)
+        if text_lenght > self.__min_width:
+            self.__min_width = text_lenght
+            self.__value_label.setMinimumWidth(text_lenght)
+
+
+    def dispatchUpdate(self, uid, value):
+        self.update(value)
+
+
+    def __update_callback(weak_ptr, reader_info):
         shared_ptr = weak_ptr()
         if shared_ptr:
-            QCoreApplication.postEvent(shared_ptr, fieldOutput.updateValueEvent(shared_ptr.__reader_info.value))
+            updateDispatcher.instance().push(shared_ptr.__reader_uid, shared_ptr, reader_info.value)
+
+
+    def getInfoReader(self):
+        return self.__reader_info
 
 
     def setInfoReader(self, reader_info):
+        self.suspend()
         self.__reader_info = reader_info
+        self.__value_label.setEnabled(not isinstance(reader_info, cachedInfoReader))
         if self.__reader_info:
-            self.__update_from_reader = lambda weak_prt=weakref.ref(self) : fieldOutput.__update_callback(weak_prt)
-            reader_info.addOnUpdateCallback(self.__update_from_reader)
+            self.__reader_uid = d2dcn.d2d.createInfoWriterUID(reader_info.mac, reader_info.service, reader_info.category, reader_info.name)
+            if self.__trend:
+                self.__trend.setUid(self.__reader_uid)
+            if not isinstance(reader_info, cachedInfoReader):
+                self.__subscription = readerDispatch.instance().attach(reader_info,
+                    lambda reader_info, weak_prt=weakref.ref(self) : fieldOutput.__update_callback(weak_prt, reader_info))
+
+
+    def suspend(self):
+        if self.__subscription:
+            self.__subscription.detach()
+            self.__subscription = None
+
+
+    def resume(self):
+        if self.__reader_info and self.__subscription == None and not isinstance(self.__reader_info, cachedInfoReader):
+            self.setInfoReader(self.__reader_info)
+            self.update(self.__reader_info.value)
+
+
+class sparklineTicker(QObject):
+
+    DEFAULT_FRAME_RATE = 10
+
+    __instance = None
+
+    def instance():
+        if sparklineTicker.__instance == None:
+            sparklineTicker.__instance = sparklineTicker()
+        return sparklineTicker.__instance
+
+
+    def __init__(self, frame_rate=DEFAULT_FRAME_RATE):
+        super().__init__()
+        self.__dirty = weakref.WeakSet()
+        self.__timer = QTimer(self)
+        self.__timer.timeout.connect(self.__tick)
+        perfCounters.instance().trackTimer(self.__timer)
+        self.setFrameRate(frame_rate)
+
+
+    def setFrameRate(self, frame_rate):
+        self.__timer.setInterval(int(1000 / frame_rate) if frame_rate > 0 else 0)
+
+
+    def markDirty(self, widget):
+        self.__dirty.add(widget)
+        if not self.__timer.isActive():
+            self.__timer.start()
+
+
+    def __tick(self):
+        dirty = self.__dirty
+        self.__dirty = weakref.WeakSet()
+        for widget in dirty:
+            if not widget.visibleRegion().isEmpty():
+                widget.update()
+
+        if len(self.__dirty) == 0:
+            self.__timer.stop()
+
+
+class sparkline(QWidget):
+
+    WIDTH = historyBuffer.ENVELOPE_BUCKETS
+
+    def __init__(self, history):
+        super().__init__()
+        self.__history = history
+        self.__uid = None
+        self.setFixedWidth(sparkline.WIDTH)
+        self.setSizePolicy(QSizePolicy.Fixed, QSizePolicy.Preferred)
+
+
+    def setUid(self, uid):
+        self.__uid = uid
+        self.markDirty()
+
+
+    def markDirty(self):
+        sparklineTicker.instance().markDirty(self)
+
+
+    def paintEvent(self, event):
+        envelope = self.__history.envelope(self.__uid) if self.__uid else None
+        if envelope == None or len(envelope) < 2:
+            return
+
+        low = min(bucket[0] for bucket in envelope)
+        high = max(bucket[1] for bucket in envelope)
+        y_scale = (self.height() - 2) / (high - low) if high > low else 0
+        x_scale = (self.width() - 1) / max(len(envelope) - 1, 1)
+        y_base = self.height() - 1 if high > low else self.height() / 2
+
+        polygon = QPolygonF()
+        for x, bucket in enumerate(envelope):
+            polygon.append(QPointF(x * x_scale, y_base - (bucket[0] - low) * y_scale))
+            if bucket[1] != bucket[0]:
+                polygon.append(QPointF(x * x_scale, y_base - (bucket[1] - low) * y_scale))
+
+        painter = QPainter(self)
+        painter.setPen(self.palette().windowText().color())
+        painter.drawPolyline(polygon)
+
+
+class arrayDetail(QWidget):
+
+    INITIAL_SIZE = (500, 300)
+
+    def __init__(self, name, valueType, value):
+        super().__init__()
+        self.setWindowTitle(name)
+
+        self.__main_layout = QVBoxLayout()
+        self.setLayout(self.__main_layout)
+
+        self.__main_layout.addWidget(QLabel(str(len(value)) + " items"))
+
+        text = QPlainTextEdit()
+        text.setReadOnly(True)
+        text.setPlainText(fieldOutput.formatValue(valueType, value, None))
+        self.__main_layout.addWidget(text)
+
+        self.resize(*arrayDetail.INITIAL_SIZE)
 
 
 class fieldInput(QWidget):
@@ -774,26 +2697,261 @@ class serviceCommand(QWidget):
         self.__exec_buttom = QPushButton()
         self.__main_layout.addWidget(self.__exec_buttom)
         self.__commad_exec_widget = commandExecution(command_obj)
+        self.__commad_exec_widget.runningChanged.connect(self.__setRunning)
+        self.__name = command_obj.name
         self.__exec_buttom.setText(command_obj.name)
         self.__exec_buttom.setEnabled(command_obj.enable)
         self.__exec_buttom.clicked.connect(lambda : self.__commad_exec_widget.runCommand())
 
 
+    def __setRunning(self, running):
+        self.__exec_buttom.setText(self.__name + " ..." if running else self.__name)
+
+
     def update(self, command_obj):
         self.__exec_buttom.setEnabled(command_obj.enable)
         self.__commad_exec_widget.upateCommand(command_obj)
 
 
+class commandRunner():
+
+    # A running call can not be interrupted, cancelled or timed out calls keep their worker until
+    # the device answers or its own timeout expires. Workers are per device so a hung device only
+    # delays its own commands.
+    MAX_WORKERS_PER_DEVICE = 2
+
+    __mutex = threading.Lock()
+    __pools = {}
+
+    def submit(command_obj, args, timeout=None) -> concurrent.futures.Future:
+        with commandRunner.__mutex:
+            entry = commandRunner.__pools.get(command_obj.mac)
+            if entry == None:
+                entry = container()
+                entry.pool = concurrent.futures.ThreadPoolExecutor(max_workers=commandRunner.MAX_WORKERS_PER_DEVICE)
+                entry.calls = 0
+                commandRunner.__pools[command_obj.mac] = entry
+            entry.calls += 1
+            future = entry.pool.submit(command_obj.call, args, timeout)
+
+        future.add_done_callback(lambda future, mac=command_obj.mac, entry=entry : commandRunner.__release(mac, entry))
+        return future
+
+
+    def __release(mac, entry):
+        # Devices come and go, an idle device keeps no workers
+        with commandRunner.__mutex:
+            entry.calls -= 1
+            if entry.calls == 0:
+                entry.pool.shutdown(wait=False)
+                if commandRunner.__pools.get(mac) is entry:
+                    del commandRunner.__pools[mac]
+
+
+    def activeDevices() -> int:
+        with commandRunner.__mutex:
+            return len(commandRunner.__pools)
+
+
+class commandFanOut():
+
+    DEFAULT_PARALLELISM = 16
+
+    def __init__(self, commands, args, parallelism=None, timeout=None):
+        if not parallelism:
+            parallelism = commandFanOut.DEFAULT_PARALLELISM
+
+        self.__commands = list(commands)
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(parallelism, len(self.__commands))))
+        self.__futures = [pool.submit(commandFanOut.__call, command, args, timeout) for command in self.__commands]
+        pool.shutdown(wait=False)
+
+
+    def __call(command, args, timeout):
+        # Calls still run on the device workers, the fan out only caps how many are in flight
+        return commandRunner.submit(command, args, timeout).result()
+
+
+    @property
+    def commands(self):
+        return list(self.__commands)
+
+
+    def addDoneCallback(self, callback):
+        for command, future in zip(self.__commands, self.__futures):
+            future.add_done_callback(lambda future, command=command : callback(command, commandFanOut.response(future)))
+
+
+    def response(future):
+        try:
+            return future.result()
+        except Exception:
+            return d2dcn.commandResponse(d2dcn.constants.commandErrorMsg.EXCEPTION_ERROR)
+
+
+    def done(self):
+        return all(future.done() for future in self.__futures)
+
+
+    def results(self, timeout=None) -> list:
+        concurrent.futures.wait(self.__futures, timeout)
+        return [(command, commandFanOut.response(future)) for command, future in zip(self.__commands, self.__futures) if future.done()]
+
+
+class commandFanOutDialog(QWidget):
+
+    INITIAL_SIZE = (700, 400)
+    COLUMNS = ["Mac", "Service", "Category", "Name", "Result"]
+
+    class resultEvent(QEvent):
+        def __init__(self, run_id, command, response):
+            super().__init__(QEvent.User)
+            self.run_id = run_id
+            self.command = command
+            self.response = response
+
+    class fanOutEvent(QEvent):
+        def __init__(self, run_id, fan_out):
+            super().__init__(QEvent.User)
+            self.run_id = run_id
+            self.fan_out = fan_out
+
+    def __init__(self, runner):
+        super().__init__()
+        self.setWindowTitle("Run command on matching services")
+        self.__runner = runner
+        self.__run_id = 0
+        self.__rows = {}
+
+        self.__main_layout = QVBoxLayout()
+        self.setLayout(self.__main_layout)
+
+        form_layout = QFormLayout()
+        self.__mac_edit = QLineEdit()
+        self.__service_edit = QLineEdit()
+        self.__category_edit = QLineEdit()
+        self.__name_edit = QLineEdit()
+        self.__args_edit = QLineEdit("{}")
+        self.__parallelism = QSpinBox()
+        self.__parallelism.setRange(1, 1024)
+        self.__parallelism.setValue(commandFanOut.DEFAULT_PARALLELISM)
+        form_layout.addRow("Mac pattern", self.__mac_edit)
+        form_layout.addRow("Service pattern", self.__service_edit)
+        form_layout.addRow("Category pattern", self.__category_edit)
+        form_layout.addRow("Command pattern", self.__name_edit)
+        form_layout.addRow("Arguments (json)", self.__args_edit)
+        form_layout.addRow("Parallel calls", self.__parallelism)
+        self.__main_layout.addLayout(form_layout)
+
+        self.__run_buttom = QPushButton("Run")
+        self.__run_buttom.clicked.connect(self.run)
+        self.__main_layout.addWidget(self.__run_buttom)
+
+        self.__status = QLabel()
+        self.__main_layout.addWidget(self.__status)
+
+        self.__table = QTableWidget(0, len(commandFanOutDialog.COLUMNS))
+        self.__table.setHorizontalHeaderLabels(commandFanOutDialog.COLUMNS)
+        self.__table.horizontalHeader().setStretchLastSection(True)
+        self.__table.verticalHeader().hide()
+        self.__main_layout.addWidget(self.__table)
+
+        self.resize(*commandFanOutDialog.INITIAL_SIZE)
+
+
+    def run(self):
+        try:
+            args = json.loads(self.__args_edit.text() or "{}")
+        except ValueError:
+            self.__status.setText("Invalid arguments")
+            return
+
+        self.__run_id += 1
+        self.__rows = {}
+        self.__table.setSortingEnabled(False)
+        self.__table.setRowCount(0)
+        self.__status.setText("Looking up commands...")
+
+        # Command lookup walks the whole d2dcn table, keep it off the GUI thread
+        threading.Thread(target=commandFanOutDialog.__lookup, daemon=True, args=[weakref.ref(self), self.__runner, self.__run_id,
+            self.__mac_edit.text(), self.__service_edit.text(), self.__category_edit.text(), self.__name_edit.text(), args,
+            self.__parallelism.value()]).start()
+
+
+    def __lookup(weak_ptr, runner, run_id, mac, service, category, name, args, parallelism):
+        fan_out = runner(mac, service, category, name, args, parallelism)
+        shared_ptr = weak_ptr()
+        if shared_ptr:
+            QCoreApplication.postEvent(shared_ptr, commandFanOutDialog.fanOutEvent(run_id, fan_out))
+
+
+    def __start(self, fan_out):
+        if len(fan_out.commands) == 0:
+            self.__status.setText("No matching commands")
+            return
+
+        for command in fan_out.commands:
+            row = self.__table.rowCount()
+            self.__table.insertRow(row)
+            for column, text in enumerate([command.mac, command.service, command.category, command.name, "Running..."]):
+                self.__table.setItem(row, column, QTableWidgetItem(text))
+            self.__rows[id(command)] = row
+
+        self.__pending = len(self.__rows)
+        self.__status.setText(str(self.__pending) + " calls pending")
+        fan_out.addDoneCallback(lambda command, response, weak_ptr=weakref.ref(self), run_id=self.__run_id : commandFanOutDialog.__result_callback(weak_ptr, run_id, command, response))
+
+
+    def __result_callback(weak_ptr, run_id, command, response):
+        shared_ptr = weak_ptr()
+        if shared_ptr:
+            QCoreApplication.postEvent(shared_ptr, commandFanOutDialog.resultEvent(run_id, command, response))
+
+
+    def event(self, event):
+        if isinstance(event, commandFanOutDialog.fanOutEvent):
+            if event.run_id == self.__run_id:
+                self.__start(event.fan_out)
+
+        elif isinstance(event, commandFanOutDialog.resultEvent):
+            if event.run_id == self.__run_id and id(event.command) in self.__rows:
+                text = event.response.error if event.response.error else json.dumps(dict(event.response))
+                self.__table.setItem(self.__rows[id(event.command)], len(commandFanOutDialog.COLUMNS) - 1, QTableWidgetItem(text))
+                self.__pending -= 1
+                self.__status.setText(str(self.__pending) + " calls pending" if self.__pending > 0 else "Done!")
+                if self.__pending == 0:
+                    self.__table.setSortingEnabled(True)
+
+        else:
+            return super().event(event)
+
+        return True
+
+
 class commandExecution(QWidget):
 
     INITIAL_WIDTH = 400
 
-    def __init__(self, command_obj):
+    runningChanged = pyqtSignal(bool)
+
+    class commandDoneEvent(QEvent):
+        def __init__(self, future):
+            super().__init__(QEvent.User)
+            self.future = future
+
+    def __init__(self, command_obj, timeout=None):
         super().__init__()
-        self.setWindowModality(Qt.ApplicationModal)
         self.setWindowFlags(Qt.WindowStaysOnTopHint)
 
         self.__command_obj = command_obj
+        self.__timeout = timeout
+        self.__future = None
+        self.__args = {}
+
+        self.__watchdog = QTimer(self)
+        self.__watchdog.setSingleShot(True)
+        self.__watchdog.timeout.connect(self.__onTimeout)
+        perfCounters.instance().trackTimer(self.__watchdog)
 
         self.__main_layout = QHBoxLayout()
         self.setLayout(self.__main_layout)
@@ -803,23 +2961,101 @@ class commandExecution(QWidget):
         self.__command_obj = command_obj
 
 
+    def setTimeout(self, timeout):
+        self.__timeout = timeout
+
+
+    def isRunning(self):
+        return self.__future != None
+
+
     def runCommand(self):
 
+        if self.isRunning():
+            self.show()
+            self.raise_()
+            return
+
         if len(self.__command_obj.params) > 0:
 
+            self.__clear()
             self.show()
 
             self.resize(commandExecution.INITIAL_WIDTH, self.height())
 
             command_args = commandArgs(self.__command_obj.params)
+            command_args.exit_buttom.clicked.connect(lambda : self.__execute(command_args.getArgs()))
             self.__main_layout.addWidget(command_args)
-            args = command_args.getArgs()
 
         else:
-            args = {}
+            self.__execute({})
+
+
+    def __execute(self, args):
+
+        self.__clear()
+        self.__args = args
+
+        running = QWidget()
+        running_layout = QVBoxLayout()
+        running.setLayout(running_layout)
+        running_layout.addWidget(QLabel("Running " + self.__command_obj.name + "..."))
+        cancel_buttom = QPushButton("Cancel")
+        cancel_buttom.clicked.connect(self.cancel)
+        running_layout.addWidget(cancel_buttom)
+        self.__main_layout.addWidget(running)
 
         # Command call
-        response = self.__command_obj.call(args)
+        self.__future = commandRunner.submit(self.__command_obj, args, self.__timeout)
+        self.__future.add_done_callback(lambda future, weak_ptr=weakref.ref(self) : commandExecution.__done_callback(weak_ptr, future))
+
+        # Without an explicit timeout d2dcn applies the one published by the device
+        if self.__timeout:
+            self.__watchdog.start(int(self.__timeout * 1000))
+        self.runningChanged.emit(True)
+
+
+    def __done_callback(weak_ptr, future):
+        shared_ptr = weak_ptr()
+        if shared_ptr:
+            QCoreApplication.postEvent(shared_ptr, commandExecution.commandDoneEvent(future))
+
+
+    def event(self, event):
+        if isinstance(event, commandExecution.commandDoneEvent):
+            if event.future is self.__future:
+                try:
+                    response = event.future.result()
+                except Exception:
+                    response = d2dcn.commandResponse(d2dcn.constants.commandErrorMsg.EXCEPTION_ERROR)
+                self.__finish(response)
+
+        else:
+            return super().event(event)
+
+        return True
+
+
+    def __onTimeout(self):
+        if self.__future:
+            self.__future.cancel()
+            self.__finish(d2dcn.commandResponse(d2dcn.constants.commandErrorMsg.TIMEOUT_ERROR))
+
+
+    def cancel(self):
+        if self.__future:
+            self.__future.cancel()
+            self.__future = None
+            self.__watchdog.stop()
+            self.runningChanged.emit(False)
+        self.hide()
+
+
+    def __finish(self, response):
+        self.__future = None
+        self.__watchdog.stop()
+        self.runningChanged.emit(False)
+        self.__clear()
 
         if not response.error and len(response) == 0:
             self.hide()
@@ -827,7 +3063,7 @@ class commandExecution(QWidget):
         else:
             self.show()
 
-            if len(args) == 0:
+            if len(self.__args) == 0:
                 self.resize(commandExecution.INITIAL_WIDTH, self.height())
 
             command_response = commmandResponse(self.__command_obj.response, response)
@@ -835,12 +3071,17 @@ class commandExecution(QWidget):
             self.__main_layout.addWidget(command_response)
 
 
+    def __clear(self):
+        while self.__main_layout.count() > 0:
+            item = self.__main_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+
+
     def hideEvent(self, event):
         super().hideEvent(event)
-        for i in range(self.__main_layout.count()):
-            item = self.__main_layout.takeAt(i)
-            if item and item.widget():
-                item.widget().deleteLater()
+        if not self.isRunning():
+            self.__clear()
 
 
 class commandArgs(QWidget):
@@ -864,17 +3105,13 @@ class commandArgs(QWidget):
         expanding_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.__main_layout.addWidget(expanding_widget)
 
-        self.loop = QEventLoop()
         self.exit_buttom = QPushButton("Execute")
         self.exit_buttom.clicked.connect(self.deleteLater)
-        self.exit_buttom.clicked.connect(self.loop.quit)
         self.__main_layout.addWidget(self.exit_buttom)
 
 
     def getArgs(self):
 
-        self.loop.exec()
-
         args = {}
         for input_field in self.__input_fields:
             value = self.__input_fields[input_field].getValue()
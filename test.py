@@ -31,13 +31,154 @@ import ServiceDiscovery
 import d2dcn
 
 import weakref
+import tempfile
+import resource
+import gc
+import os
+import re
 
 import PyQt5
+import PyQt5.QtCore
+import PyQt5.QtWidgets
 
 class container():
     pass
 
 
+class fakeReader():
+
+    def __init__(self, mac, service, category, name, valueType=d2dcn.constants.valueTypes.INT, value=0):
+        self.mac = mac
+        self.service = service
+        self.category = category
+        self.name = name
+        self.valueType = valueType
+        self.ip = "127.0.0.1"
+        self.value = value
+        self.epoch = int(time.time())
+        self.callbacks = []
+        self.__mutex = threading.Lock()
+
+
+    @property
+    def online(self):
+        return self.value != None
+
+
+    def addOnUpdateCallback(self, callback):
+        # Held weakly like d2dcn, a dropped callback unregisters itself
+        weak_ptr = weakref.ref(callback)
+        with self.__mutex:
+            if weak_ptr not in self.callbacks:
+                self.callbacks.append(weak_ptr)
+
+
+    def observed(self):
+        with self.__mutex:
+            return any(weak_callback() for weak_callback in self.callbacks)
+
+
+    def publish(self, value):
+        self.value = value
+        self.epoch = int(time.time())
+        with self.__mutex:
+            callbacks = [weak_callback() for weak_callback in self.callbacks]
+            self.callbacks = [weak_callback for weak_callback in self.callbacks if weak_callback() != None]
+
+        for callback in callbacks:
+            if callback:
+                callback()
+
+
+class fakeCommand():
+
+    def __init__(self, mac, service, category, name):
+        self.mac = mac
+        self.service = service
+        self.category = category
+        self.name = name
+        self.ip = "127.0.0.1"
+        self.enable = True
+        self.params = d2dcn.commandArgsDef()
+        self.response = d2dcn.commandArgsDef()
+
+
+    def call(self, args, timeout=None):
+        return d2dcn.commandResponse("{}")
+
+
+class fakeTarget():
+
+    def __init__(self):
+        self.values = []
+
+
+    def dispatchUpdate(self, uid, value):
+        self.values.append((uid, value))
+
+
+class fakeClient():
+
+    def __init__(self):
+        self.infos = {}
+        self.commands = {}
+        self.onCommandAdd = None
+        self.onCommandUpdate = None
+        self.onCommandRemove = None
+        self.onInfoAdd = None
+        self.onInfoUpdate = None
+        self.onInfoRemove = None
+
+
+    def start(self):
+        pass
+
+
+    def stop(self):
+        pass
+
+
+    def search(objects, uid, wait):
+        # Plain names resolve directly, regular expressions fall back to a full scan like d2d
+        found = [objects[uid]] if uid in objects else [objects[path] for path in list(objects) if re.search(uid, path)]
+        # Like d2dcn, a lookup without matches only returns when it is allowed to give up
+        if len(found) == 0 and wait == 0:
+            raise RuntimeError("lookup would block forever")
+        return found
+
+
+    def getAvailableInfoReaders(self, name="", service="", category="", mac="", wait=0):
+        return fakeClient.search(self.infos, d2dcn.d2d.createInfoWriterUID(mac, service, category, name), wait)
+
+
+    def getAvailableComands(self, name="", service="", category="", mac="", wait=0):
+        return fakeClient.search(self.commands, d2dcn.d2d.createCommandUID(mac, service, category, name), wait)
+
+
+    def addInfo(self, reader):
+        self.infos[d2dcn.d2d.createInfoWriterUID(reader.mac, reader.service, reader.category, reader.name)] = reader
+        if self.onInfoAdd:
+            self.onInfoAdd(reader.mac, reader.service, reader.category, reader.name)
+
+
+    def removeInfo(self, reader):
+        del self.infos[d2dcn.d2d.createInfoWriterUID(reader.mac, reader.service, reader.category, reader.name)]
+        if self.onInfoRemove:
+            self.onInfoRemove(reader.mac, reader.service, reader.category, reader.name)
+
+
+    def addCommand(self, command):
+        self.commands[d2dcn.d2d.createCommandUID(command.mac, command.service, command.category, command.name)] = command
+        if self.onCommandAdd:
+            self.onCommandAdd(command.mac, command.service, command.category, command.name)
+
+
+    def removeCommand(self, command):
+        del self.commands[d2dcn.d2d.createCommandUID(command.mac, command.service, command.category, command.name)]
+        if self.onCommandRemove:
+            self.onCommandRemove(command.mac, command.service, command.category, command.name)
+
+
 class mqttBroker(unittest.TestCase):
 
     def __init__(self):
@@ -61,7 +202,10 @@ class mqttBroker(unittest.TestCase):
 class Test_d2dcnWidget(unittest.TestCase):
 
     def setUp(self):
-        self.app = PyQt5.QtWidgets.QApplication(sys.argv)
+        # Keep the application on the class, destroying it also destroys the shared dispatchers
+        if not PyQt5.QtWidgets.QApplication.instance():
+            Test_d2dcnWidget.app = PyQt5.QtWidgets.QApplication(sys.argv)
+        self.app = PyQt5.QtWidgets.QApplication.instance()
 
 
     def createSimulatedDevice(self, service, command_prefix, info_prefix, info_category="test"):
@@ -159,6 +303,522 @@ class Test_d2dcnWidget(unittest.TestCase):
         self.app.exec()
 
 
+    def test3_CoalescedUpdates(self):
+
+        dispatcher = d2dcnWidget.updateDispatcher(flush_rate=0)
+        item = fakeTarget()
+        for value in range(100):
+            dispatcher.push("uid", item, value)
+
+        self.assertEqual(dispatcher.pendingCount(), 1)
+        self.app.processEvents()
+        self.assertEqual(item.values, [("uid", 99)])
+        self.assertEqual(dispatcher.pendingCount(), 0)
+
+        # Outputs sharing an info are coalesced apart, each one shows the last value
+        other = fakeTarget()
+        for value in range(10):
+            dispatcher.push("uid", item, value)
+            dispatcher.push("uid", other, value)
+
+        self.assertEqual(dispatcher.pendingCount(), 2)
+        self.app.processEvents()
+        self.assertEqual(item.values, [("uid", 99), ("uid", 9)])
+        self.assertEqual(other.values, [("uid", 9)])
+
+
+    def test4_SteadyUpdatesDoNotRelayout(self):
+
+        class layoutRequestCounter(PyQt5.QtCore.QObject):
+            def __init__(self):
+                super().__init__()
+                self.count = 0
+
+            def eventFilter(self, obj, event):
+                if event.type() == PyQt5.QtCore.QEvent.LayoutRequest:
+                    self.count += 1
+                return False
+
+        parent = PyQt5.QtWidgets.QWidget()
+        layout = PyQt5.QtWidgets.QVBoxLayout()
+        parent.setLayout(layout)
+        field = d2dcnWidget.fieldOutput("counter", d2dcn.constants.valueTypes.INT, 0)
+        layout.addWidget(field)
+        parent.show()
+
+        for value in [1, 10, 100, 1000]:
+            field.update(value)
+            self.app.processEvents()
+        self.app.processEvents()
+
+        counter = layoutRequestCounter()
+        parent.installEventFilter(counter)
+        field.installEventFilter(counter)
+        for value in range(1000):
+            field.update(value)
+            self.app.processEvents()
+
+        self.assertEqual(counter.count, 0)
+
+
+    def test5_ValueLogRoundTrip(self):
+
+        info = container()
+        info.mac = "mac"
+        info.service = "service"
+        info.category = "category"
+        info.name = "values"
+        info.valueType = d2dcn.constants.valueTypes.FLOAT_ARRAY
+
+        for compress in [False, True]:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "values.log")
+                for session in range(2):
+                    writer = d2dcnWidget.valueLogWriter(path, compress)
+                    for value in range(100):
+                        writer.writeValue(info, [float(value), 0.5], value)
+                    writer.writeRemove(info.mac, info.service, info.category, info.name, 100)
+                    writer.close()
+
+                records = list(d2dcnWidget.valueLogReader(path).records())
+                values = [record[3] for record in records if record[0] == d2dcnWidget.valueLog.VALUE_RECORD]
+                self.assertEqual(len(records), 2 * 102)
+                self.assertEqual(values[99], [99.0, 0.5])
+                self.assertEqual(records[-1][0], d2dcnWidget.valueLog.REMOVE_RECORD)
+
+                # A torn last chunk is dropped so the next session stays readable
+                os.truncate(path, os.path.getsize(path) - 50)
+                writer = d2dcnWidget.valueLogWriter(path, compress)
+                for value in range(100):
+                    writer.writeValue(info, [float(value), 1.5], value)
+                writer.close()
+
+                records = list(d2dcnWidget.valueLogReader(path).records())
+                values = [record[3] for record in records if record[0] == d2dcnWidget.valueLog.VALUE_RECORD]
+                self.assertEqual(len(records), 102 + 101)
+                self.assertEqual(values[-100:], [[float(value), 1.5] for value in range(100)])
+
+            # Removing an info must not hand its ID to a new one while others are still live
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, "values.log")
+                infos = {}
+                for name in ["a", "b", "c"]:
+                    infos[name] = container()
+                    infos[name].mac = info.mac
+                    infos[name].service = info.service
+                    infos[name].category = info.category
+                    infos[name].name = name
+                    infos[name].valueType = d2dcn.constants.valueTypes.INT
+
+                writer = d2dcnWidget.valueLogWriter(path, compress)
+                writer.writeValue(infos["a"], 1, 1)
+                writer.writeValue(infos["b"], 2, 2)
+                writer.writeRemove(info.mac, info.service, info.category, "a", 3)
+                writer.writeValue(infos["c"], 3, 4)
+                writer.writeValue(infos["b"], 22, 5)
+                writer.writeRemove(info.mac, info.service, info.category, "b", 6)
+                writer.writeValue(infos["c"], 33, 7)
+                writer.close()
+
+                records = list(d2dcnWidget.valueLogReader(path).records())
+                values = [(record[2].name, record[3]) for record in records if record[0] == d2dcnWidget.valueLog.VALUE_RECORD]
+                removes = [record[2].name for record in records if record[0] == d2dcnWidget.valueLog.REMOVE_RECORD]
+                self.assertEqual(values, [("a", 1), ("b", 2), ("c", 3), ("b", 22), ("c", 33)])
+                self.assertEqual(removes, ["a", "b"])
+
+
+
+    def test6_HistoryBudgetEviction(self):
+
+        store = d2dcnWidget.historyStore(capacity=10, budget=3 * d2dcnWidget.historyBuffer(10).nbytes)
+        for uid in ["a", "b", "c"]:
+            for value in range(25):
+                store.record(uid, value, value)
+
+        timestamps, values = store.samples("a")
+        self.assertEqual(list(values), [float(value) for value in range(15, 25)])
+
+        store.record("d", 0, 0)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.samples("a"), None)
+        self.assertNotEqual(store.samples("d"), None)
+
+
+
+    def test7_SparklineDecimation(self):
+
+        buffer = d2dcnWidget.historyBuffer(10000)
+        for value in range(10):
+            buffer.append(value, float(value % 7))
+        self.assertEqual(len(buffer.envelope()), 10)
+
+        for value in range(10, 25003):
+            buffer.append(value, float(value % 7))
+        envelope = buffer.envelope()
+        self.assertLessEqual(len(envelope), d2dcnWidget.historyBuffer.ENVELOPE_BUCKETS)
+        self.assertEqual(min(bucket[0] for bucket in envelope), 0)
+        self.assertEqual(max(bucket[1] for bucket in envelope), 6)
+
+        # Buckets follow the ring, oldest first and only covering retained samples
+        buffer = d2dcnWidget.historyBuffer(1000)
+        for value in range(2503):
+            buffer.append(value, float(value))
+        envelope = buffer.envelope()
+        self.assertGreaterEqual(envelope[0][0], 1503)
+        self.assertEqual(envelope[-1][1], 2502)
+        self.assertEqual([bucket[0] for bucket in envelope], sorted(bucket[0] for bucket in envelope))
+
+
+
+    def test8_ChurnReclaimsResources(self):
+
+        def settle():
+            for step in range(3):
+                self.app.processEvents()
+                PyQt5.QtCore.QCoreApplication.sendPostedEvents(None, PyQt5.QtCore.QEvent.DeferredDelete)
+            gc.collect()
+
+        def rss():
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * resource.getpagesize()
+
+        view = d2dcnWidget.serviceView(False, False, False)
+        view.show()
+
+        readers = []
+        def churn(devices):
+            del readers[:]
+            for device in range(devices):
+                mac = "mac" + str(device)
+                for index in range(6):
+                    reader = fakeReader(mac, "service", "category" + str(index % 3), "info" + str(index))
+                    readers.append(reader)
+                    view.addServiceInfo(reader)
+                view.addServiceCommand(fakeCommand(mac, "service", "commands", "command"))
+            settle()
+
+            for reader in readers:
+                view.removeServiceInfo(reader.mac, reader.service, reader.category, reader.name)
+            for device in range(devices):
+                view.removeServiceCommand("mac" + str(device), "service", "commands", "command")
+            settle()
+
+        churn(200)
+        widgets = len(view.findChildren(PyQt5.QtWidgets.QWidget))
+        objects = len(gc.get_objects())
+        memory = rss()
+
+        for cycle in range(10):
+            churn(200)
+
+        self.assertEqual(len(view.findChildren(PyQt5.QtWidgets.QWidget)), widgets)
+        self.assertEqual(view.widgetCounts(), {})
+        self.assertLess(len(gc.get_objects()), objects + 1000)
+        self.assertLess(rss(), memory + 20 * 1024 * 1024)
+        self.assertFalse(any(reader.observed() for reader in readers))
+        self.assertEqual(d2dcnWidget.readerDispatch.instance().observerCount(), 0)
+
+        # Same churn through d2dcnWidget, every device is new so per UID state must not pile up
+        def waitFor(condition):
+            start = time.monotonic()
+            while not condition() and time.monotonic() - start < 10:
+                self.app.processEvents()
+                time.sleep(0.001)
+            self.assertTrue(condition())
+
+        client = fakeClient()
+        widget = d2dcnWidget.d2dcnWidget(view_mode=d2dcnWidget.d2dcnWidget.TABLE_VIEW, client=client)
+        widget.subscribeInfo(mac="mac.*")
+        widget.subscribeComands(mac="mac.*")
+        widget.setInfoRenderPolicy(name="info0", max_rate=1000)
+
+        def widgetChurn(cycle, devices):
+            cycle_readers = []
+            cycle_commands = []
+            for device in range(devices):
+                mac = "mac" + str(cycle) + "_" + str(device)
+                for index in range(6):
+                    reader = fakeReader(mac, "service", "category" + str(index % 3), "info" + str(index))
+                    cycle_readers.append(reader)
+                    client.addInfo(reader)
+                cycle_commands.append(fakeCommand(mac, "service", "commands", "command"))
+                client.addCommand(cycle_commands[-1])
+
+            waitFor(lambda : len(widget.performanceCounters()["widgets_per_service"]) == devices and
+                all(reader.observed() for reader in cycle_readers))
+
+            for reader in cycle_readers:
+                reader.publish(reader.value + 1)
+            waitFor(lambda : d2dcnWidget.updateDispatcher.instance().pendingCount() == 0)
+
+            for reader in cycle_readers:
+                client.removeInfo(reader)
+            for command in cycle_commands:
+                client.removeCommand(command)
+            waitFor(lambda : widget.performanceCounters()["widgets_per_service"] == {})
+            settle()
+
+        for cycle in range(5):
+            widgetChurn(cycle, 50)
+
+        counters = widget.performanceCounters()
+        self.assertEqual(counters["filter_cache_entries"], 0)
+        self.assertEqual(counters["render_cache_entries"], 0)
+        self.assertEqual(counters["reader_observers"], 0)
+        widget.setInfoRenderPolicy(name="info0")
+
+
+    def test9_ReaderDispatchFanOut(self):
+
+        reader = fakeReader("mac", "service", "category", "name")
+
+        dispatch = d2dcnWidget.readerDispatch.instance()
+        received = []
+        subscriptions = [dispatch.attach(reader, lambda reader, index=index : received.append((index, reader.value))) for index in range(3)]
+        self.assertEqual(len(reader.callbacks), 1)
+
+        reader.publish(1)
+        self.assertEqual(sorted(received), [(0, 1), (1, 1), (2, 1)])
+
+        subscriptions[0].detach()
+        del subscriptions[1]
+        del received[:]
+        reader.publish(2)
+        self.assertEqual(received, [(2, 2)])
+
+        # Rebinding an output many times keeps a single observer on the reader
+        output = d2dcnWidget.fieldOutput("name", reader.valueType, reader.value)
+        for step in range(10):
+            output.setInfoReader(reader)
+        self.assertEqual(dispatch.observerCount(reader), 2)
+
+        output.setInfoReader(None)
+        subscriptions[-1].detach()
+        self.assertEqual(dispatch.observerCount(reader), 0)
+        self.assertFalse(reader.observed())
+
+        # A subscription collected while the dispatch lock is held detaches re-entrantly
+        subscription = dispatch.attach(reader, lambda reader : None)
+        def collect():
+            with dispatch._readerDispatch__mutex:
+                subscription.detach()
+        worker = threading.Thread(target=collect, daemon=True)
+        worker.start()
+        worker.join(5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(dispatch.observerCount(reader), 0)
+
+
+
+    def test10_RenderBudgetAndRateLimits(self):
+
+        dispatcher = d2dcnWidget.updateDispatcher(flush_rate=0, render_budget=3)
+        dispatcher.setRenderPolicy("alarm", pinned=True)
+        dispatcher.setRenderPolicy("noisy", max_rate=20)
+        output = fakeTarget()
+
+        for index in range(5):
+            dispatcher.push("value" + str(index), output, index)
+        dispatcher.push("alarm", output, True)
+        dispatcher.flush()
+        self.assertEqual(output.values[0], ("alarm", True))
+        self.assertEqual(len(output.values), 3)
+        self.assertEqual(dispatcher.pendingCount(), 3)
+
+        dispatcher.flush()
+        dispatcher.flush()
+        self.assertEqual(len(output.values), 6)
+
+        del output.values[:]
+        dispatcher.push("noisy", output, 1)
+        dispatcher.flush()
+        dispatcher.push("noisy", output, 2)
+        dispatcher.flush()
+        self.assertEqual(output.values, [("noisy", 1)])
+
+        time.sleep(0.06)
+        dispatcher.flush()
+        self.assertEqual(output.values, [("noisy", 1), ("noisy", 2)])
+
+
+
+    def test11_UnchangedValuesSkipRender(self):
+
+        def unchanged():
+            return d2dcnWidget.perfCounters.instance().snapshot()[d2dcnWidget.perfCounters.UNCHANGED_UPDATES]
+
+        output = d2dcnWidget.fieldOutput("name", d2dcn.constants.valueTypes.INT, 5)
+        array_output = d2dcnWidget.fieldOutput("array", d2dcn.constants.valueTypes.INT_ARRAY, [1, 2, 3])
+        line_edit = output.findChild(PyQt5.QtWidgets.QLineEdit)
+        array_line_edit = array_output.findChild(PyQt5.QtWidgets.QLineEdit)
+        skipped = unchanged()
+
+        output.update(5)
+        array_output.update([1, 2, 3])
+        self.assertEqual(unchanged(), skipped + 2)
+
+        output.update(6)
+        self.assertEqual(line_edit.text(), "6")
+
+        # Arrays are compared by content, in place changes are still shown
+        value = [1, 2, 3]
+        array_output.update(value)
+        value[0] = 9
+        array_output.update(value)
+        self.assertEqual(array_line_edit.text(), d2dcnWidget.fieldOutput.formatValue(d2dcn.constants.valueTypes.INT_ARRAY, [9, 2, 3]))
+        self.assertEqual(unchanged(), skipped + 3)
+
+        # Lists differing only in values that hash alike, hash(-1) == hash(-2), must still render
+        negative_output = d2dcnWidget.fieldOutput("negative", d2dcn.constants.valueTypes.INT_ARRAY, [-1, 5])
+        negative_output.update([-2, 5])
+        self.assertEqual(negative_output.findChild(PyQt5.QtWidgets.QLineEdit).text(), d2dcnWidget.fieldOutput.formatValue(d2dcn.constants.valueTypes.INT_ARRAY, [-2, 5]))
+        self.assertEqual(unchanged(), skipped + 3)
+
+
+
+    def test12_TableRemovalKeepsRowsConsistent(self):
+
+        def names(model):
+            return [model.data(model.index(row, d2dcnWidget.infoTableModel.NAME_COLUMN)) for row in range(model.rowCount())]
+
+        view = d2dcnWidget.infoTableView()
+        model = view.model()
+        proxy = view.findChild(PyQt5.QtWidgets.QTableView).model()
+        for index in range(8):
+            reader = fakeReader("mac", "service", "category", "info" + str(index), value=index)
+            model.addInfo(reader)
+
+        # Removed and added back before the removal ran keeps the row
+        model.removeInfo("mac", "service", "category", "info7")
+        model.addInfo(reader)
+        model.removeInfo("mac", "service", "category", "info6")
+        self.app.processEvents()
+        self.assertEqual(names(model), ["info" + str(index) for index in [0, 1, 2, 3, 4, 5, 7]])
+
+        view.findChild(PyQt5.QtWidgets.QLineEdit).setText("info5")
+        model.removeInfo("mac", "service", "category", "info1")
+        self.app.processEvents()
+        self.assertEqual(names(proxy), ["info5"])
+
+        view.findChild(PyQt5.QtWidgets.QLineEdit).setText("")
+        view.findChild(PyQt5.QtWidgets.QTableView).sortByColumn(d2dcnWidget.infoTableModel.NAME_COLUMN, PyQt5.QtCore.Qt.DescendingOrder)
+        model.removeInfo("mac", "service", "category", "info2")
+        model.removeInfo("mac", "service", "category", "info7")
+        self.app.processEvents()
+        self.assertEqual(names(proxy), ["info5", "info4", "info3", "info0"])
+
+        self.assertEqual(sorted(names(model)), ["info0", "info3", "info4", "info5"])
+        for row in range(model.rowCount()):
+            self.assertEqual(model.data(model.index(row, d2dcnWidget.infoTableModel.VALUE_COLUMN)), names(model)[row][-1])
+
+        # Updates still reach rows that shifted up
+        model.dispatchUpdate(d2dcn.d2d.createInfoWriterUID("mac", "service", "category", "info4"), 40)
+        self.assertEqual(model.data(model.index(names(model).index("info4"), d2dcnWidget.infoTableModel.VALUE_COLUMN)), "40")
+
+
+
+    def test13_CommandFanOut(self):
+
+        calls = container()
+        calls.mutex = threading.Lock()
+        calls.active = 0
+        calls.peak = 0
+
+        class countedCommand(fakeCommand):
+            def call(self, args, timeout=None):
+                with calls.mutex:
+                    calls.active += 1
+                    calls.peak = max(calls.peak, calls.active)
+                time.sleep(0.05)
+                with calls.mutex:
+                    calls.active -= 1
+                return d2dcn.commandResponse("{}")
+
+        client = fakeClient()
+        for index in range(10):
+            client.addCommand(countedCommand("mac" + str(index), "service", "commands", "reset"))
+
+        widget = d2dcnWidget.d2dcnWidget(client=client)
+        fan_out = widget.runCommands(command="reset", parallelism=3)
+        self.assertEqual(len(fan_out.results(5)), 10)
+        self.assertEqual(calls.peak, 3)
+
+        # Commands on one device share its workers, and idle devices release them
+        calls.peak = 0
+        for command in client.commands.values():
+            command.mac = "shared"
+        self.assertEqual(len(widget.runCommands(command="reset", parallelism=5).results(5)), 10)
+        self.assertEqual(calls.peak, d2dcnWidget.commandRunner.MAX_WORKERS_PER_DEVICE)
+
+        start = time.monotonic()
+        while d2dcnWidget.commandRunner.activeDevices() > 0 and time.monotonic() - start < 5:
+            time.sleep(0.01)
+        self.assertEqual(d2dcnWidget.commandRunner.activeDevices(), 0)
+
+        self.assertEqual(widget.runCommands(command="missing").commands, [])
+
+        widget.showFanOutDialog()
+        dialog = next(item for item in PyQt5.QtWidgets.QApplication.topLevelWidgets() if isinstance(item, d2dcnWidget.commandFanOutDialog))
+        dialog.findChildren(PyQt5.QtWidgets.QLineEdit)[3].setText("missing")
+        dialog.run()
+
+        start = time.monotonic()
+        status = lambda : [label.text() for label in dialog.findChildren(PyQt5.QtWidgets.QLabel)]
+        while "No matching commands" not in status() and time.monotonic() - start < 5:
+            self.app.processEvents()
+            time.sleep(0.01)
+        self.assertIn("No matching commands", status())
+        dialog.close()
+
+
+
+    def test14_HistoryObserversFollowCapacity(self):
+
+        reader = fakeReader("mac", "service", "category", "counter", value=1)
+        client = fakeClient()
+        widget = d2dcnWidget.d2dcnWidget(client=client)
+        client.addInfo(reader)
+
+        start = time.monotonic()
+        while widget.performanceCounters()["widgets_per_service"] == {} and time.monotonic() - start < 5:
+            self.app.processEvents()
+            time.sleep(0.01)
+        for step in range(10):
+            self.app.processEvents()
+
+        dispatch = d2dcnWidget.readerDispatch.instance()
+        observers = dispatch.observerCount(reader)
+
+        widget.setHistory(100)
+        self.assertEqual(dispatch.observerCount(reader), observers + 1)
+
+        widget.setHistory(0)
+        self.assertEqual(dispatch.observerCount(reader), observers)
+
+
+    def test15_ResolverRetriesFailedLookups(self):
+
+        class failingClient(fakeClient):
+            def getAvailableInfoReaders(self, name="", service="", category="", mac="", wait=0):
+                self.failures -= 1
+                if self.failures >= 0:
+                    raise RuntimeError("lookup failed")
+                return ["reader"]
+
+        client = failingClient()
+        client.failures = 1
+        resolver = d2dcnWidget.objectResolver(client)
+        resolved = []
+        start = time.monotonic()
+        while len(resolved) == 0 and time.monotonic() - start < 5:
+            resolver.resolveInfo("mac", "service", "category", "name", resolved.append)
+            time.sleep(0.01)
+
+        self.assertEqual(resolved, ["reader"])
+        self.assertEqual(client.failures, -1)
+        self.assertEqual(resolver.cachedInfo("mac", "service", "category", "name"), "reader")
+
+
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser()